@@ -0,0 +1,287 @@
+#########################
+### B E N C H M A R K ###
+#########################
+
+
+# Contains the performance measurements
+#
+# The vector benchmark measures the bytes each Vector takes and how many of the common Vector
+# operations run per second. Another Vector.py can be given to compare against, such as an
+# older revision checked out from git:
+#
+#     git show <revision>:Vector.py > /tmp/Vector_before.py
+#     python Benchmark.py vector /tmp/Vector_before.py
+#
+# The scene benchmark runs each scene generator at several sizes through each engine and
+# writes the results as JSON, optionally comparing them with an earlier run. The engines that
+# only work along x only run the scenes whose bodies all lie and move along x:
+#
+#     python Benchmark.py scenes --sizes 8 64 512 --output after.json --compare before.json
+
+
+import argparse, importlib.util, json, platform, signal, sys, time, timeit, tracemalloc
+
+import numpy
+
+import Vector as current_vector
+from Simulation import *
+from Profiler import profiler
+
+
+def load_vector_module(path):
+    """Imports a Vector.py from the given path under its own module name"""
+    spec = importlib.util.spec_from_file_location('vector_' + str(abs(hash(path))), path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _create(module, value):
+    """Calls create_vector with a class, falling back to the older class name lookup"""
+    try:
+        return module.Vector.create_vector(module.Position, value)
+    except (KeyError, TypeError):
+        return module.Vector.create_vector("Position", value)
+
+
+def vector_memory(module, count=10000):
+    """Returns the bytes allocated per Position made from a nonzero value
+
+    >>> vector_memory(current_vector, 100) < 100
+    True
+    """
+    _create(module, 1)
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    vectors = [_create(module, index + 1) for index in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return (after - before - sys.getsizeof(vectors)) / count
+
+
+def vector_ops(module, number=100000):
+    """Returns the operations per second of the hot Vector operations"""
+    left, right = module.Position(1, 10), module.Velocity(-1, 4)
+    cases = {
+        'construct': lambda: module.Position(1, 10),
+        'create_vector': lambda: _create(module, 10),
+        'add': lambda: left + right,
+        'scalar_mul': lambda: left * 3,
+        'compare': lambda: left < right,
+        'calc_position': lambda: right.calc_position(2),
+    }
+    return {name: number / timeit.timeit(case, number=number) for name, case in cases.items()}
+
+
+def vector_report(baseline_path=None):
+    """Prints bytes per vector and ops/sec, side by side with a baseline when given"""
+    modules = [('current', current_vector)]
+    if baseline_path:
+        modules.insert(0, ('baseline', load_vector_module(baseline_path)))
+
+    results = [(name, vector_memory(module), vector_ops(module)) for name, module in modules]
+    print('%-16s' % 'metric' + ''.join('%16s' % name for name, _, _ in results))
+    print('%-16s' % 'bytes/vector' + ''.join('%16.1f' % memory for _, memory, _ in results))
+    for case in results[0][2]:
+        print('%-16s' % (case + '/s') + ''.join('%16.0f' % ops[case] for _, _, ops in results))
+
+
+class TimeLimit(Exception):
+    """Raised when a benchmark case runs past its time limit"""
+
+
+def _alarm(signum, frame):
+    raise TimeLimit()
+
+
+engines = {
+    'overlap': dict(engine='overlap'),
+    'overlap_sap': dict(engine='overlap', broadphase='sap'),
+    'overlap_grid': dict(engine='overlap', broadphase='grid'),
+    'overlap_cache': dict(engine='overlap', contact_cache=True),
+    'overlap_grid_cache': dict(engine='overlap', broadphase='grid', contact_cache=True),
+    'overlap_grid_sleep': dict(engine='overlap', broadphase='grid', sleep_after=3),
+    'overlap_grid_substeps': dict(engine='overlap', broadphase='grid', substeps=8),
+    'islands_grid': dict(engine='islands', broadphase='grid'),
+    'chains': dict(engine='chains'),
+    'events': dict(engine='events'),
+}
+
+# the engines that only resolve collisions along x, and the scenes they can run
+line_engines = ('chains', 'events')
+line_scenes = ('cradle', 'gas', 'mass_ratio')
+
+
+def runs(name, engine):
+    """Returns whether the engine can run the scene
+
+    >>> runs('field', 'chains'), runs('field', 'overlap'), runs('gas', 'events')
+    (False, True, True)
+    """
+    return engine not in line_engines or name in line_scenes
+
+
+def _run(simulation, steps, time_limit):
+    """Steps the simulation until it has taken steps or time_limit seconds have passed, and
+    returns the seconds it took and whether it ran out of time"""
+    timed_out = False
+    if time_limit and hasattr(signal, 'setitimer'):
+        previous = signal.signal(signal.SIGALRM, _alarm)
+        signal.setitimer(signal.ITIMER_REAL, time_limit)
+    start = time.perf_counter()
+    try:
+        for _ in range(steps):
+            simulation.step()
+    except TimeLimit:
+        timed_out = True
+    finally:
+        elapsed = time.perf_counter() - start
+        if time_limit and hasattr(signal, 'setitimer'):
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+    return elapsed, timed_out
+
+
+def profile_steps(scene, engine, steps, time_limit):
+    """Takes steps in a new Simulation of the scene with the profiler enabled and returns the
+    seconds of each phase and the counters, per step"""
+    enabled = profiler.enabled
+    profiler.disable()
+    profiler.reset()
+    simulation = Simulation(scene, **engines[engine])
+    profiler.enable()
+    try:
+        _run(simulation, steps, time_limit)
+    finally:
+        profiler.disable()
+    done = max(simulation.steps, 1)
+    phases = {name: seconds / done for name, (seconds, calls) in profiler.phases.items()}
+    counters = {name: count / done for name, count in profiler.counters.items()}
+    profiler.reset()
+    if enabled:
+        profiler.enable()
+    return phases, counters
+
+
+def peak_memory(scene, engine, steps=10):
+    """Returns the peak bytes allocated per entity while building a scene and taking a few steps"""
+    tracemalloc.start()
+    simulation = Simulation(scene, **engines[engine])
+    simulation.run(steps)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / len(simulation.entities)
+
+
+def scene_case(name, size, engine, steps=100, time_limit=10):
+    """Benchmarks one scene size with one engine and returns its results
+
+    The steps per second come from a run with the profiler off, and the phase times and
+    single_collision calls from a second run with it on.
+
+    >>> result = scene_case('cradle', 4, 'chains', steps=5)
+    >>> result['steps'], result['entities'], result['timed_out']
+    (5, 5, False)
+    >>> result = scene_case('gas', 8, 'overlap', steps=20)
+    >>> sorted(result['phase_seconds_per_step'])[:3], result['single_collision_calls_per_step'] >= result['resolved_per_step'] > 0
+    (['collision', 'collision_box', 'move'], True)
+    """
+    scene = generators[name](size)
+    simulation = Simulation(scene, **engines[engine])
+    elapsed, timed_out = _run(simulation, steps, time_limit)
+    phases, counters = profile_steps(scene, engine, steps, time_limit) if not timed_out else ({}, {})
+
+    done = max(simulation.steps, 1)
+    return {
+        'scene': name,
+        'size': size,
+        'engine': engine,
+        'entities': len(simulation.entities),
+        'steps': simulation.steps,
+        'timed_out': timed_out,
+        'steps_per_sec': simulation.steps / elapsed if elapsed else None,
+        'passes_per_step': simulation.passes / done,
+        'resolved_per_step': simulation.resolved / done,
+        'single_collision_calls_per_step': counters.get('single_collision_calls', 0),
+        'phase_seconds_per_step': phases,
+        'peak_bytes_per_entity': None if timed_out else peak_memory(scene, engine),
+    }
+
+
+def scene_report(scene_names, sizes, engine_names, steps, time_limit):
+    """Runs every scene, size and engine that can run it and returns the results with the
+    run's environment"""
+    results = []
+    for name in scene_names:
+        for size in sizes:
+            for engine in engine_names:
+                if not runs(name, engine):
+                    continue
+                result = scene_case(name, size, engine, steps, time_limit)
+                results.append(result)
+                print('%-10s %6d %-21s %10.1f steps/s %8.2f passes %8.2f calls%s' % (
+                    name, size, engine, result['steps_per_sec'] or 0, result['passes_per_step'],
+                    result['single_collision_calls_per_step'], '  (timed out)' if result['timed_out'] else ''))
+    return {
+        'python': platform.python_version(),
+        'numpy': numpy.__version__,
+        'machine': platform.machine(),
+        'time': time.time(),
+        'results': results,
+    }
+
+
+def compare(before, after, tolerance=0.1):
+    """Returns the cases whose steps/sec fell by more than tolerance between two reports
+
+    >>> case = dict(scene='gas', size=8, engine='chains', steps_per_sec=100.0)
+    >>> compare({'results': [case]}, {'results': [dict(case, steps_per_sec=80.0)]})
+    [('gas', 8, 'chains', 100.0, 80.0)]
+    """
+    key = lambda result: (result['scene'], result['size'], result['engine'])
+    old = {key(result): result['steps_per_sec'] for result in before['results']}
+    regressions = []
+    for result in after['results']:
+        rate = old.get(key(result))
+        if rate and result['steps_per_sec'] is not None and result['steps_per_sec'] < rate * (1 - tolerance):
+            regressions.append(key(result) + (rate, result['steps_per_sec']))
+    return regressions
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Runs the performance benchmarks')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    vector = commands.add_parser('vector', help='Vector bytes and ops/sec')
+    vector.add_argument('baseline', nargs='?', help='another Vector.py to compare against')
+
+    scenes = commands.add_parser('scenes', help='scaling of the collision pipeline')
+    scenes.add_argument('--scenes', nargs='+', default=sorted(generators), choices=sorted(generators))
+    scenes.add_argument('--sizes', nargs='+', type=int, default=[8, 64, 512])
+    scenes.add_argument('--engines', nargs='+', default=list(engines), choices=list(engines))
+    scenes.add_argument('--steps', type=int, default=100)
+    scenes.add_argument('--time-limit', type=float, default=10, help='seconds per case, 0 for none')
+    scenes.add_argument('--output', help='JSON file to write the results to')
+    scenes.add_argument('--compare', help='JSON file of an earlier run to check for regressions')
+    scenes.add_argument('--tolerance', type=float, default=0.1)
+    args = parser.parse_args(args)
+
+    if args.command == 'vector':
+        vector_report(args.baseline)
+        return
+
+    report = scene_report(args.scenes, args.sizes, args.engines, args.steps, args.time_limit)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=1)
+    if args.compare:
+        with open(args.compare) as file:
+            regressions = compare(json.load(file), report, args.tolerance)
+        for scene, size, engine, before, after in regressions:
+            print('REGRESSION %s %d %s: %.1f -> %.1f steps/s' % (scene, size, engine, before, after))
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
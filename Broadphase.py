@@ -0,0 +1,266 @@
+###########################
+### B R O A D P H A S E ###
+###########################
+
+
+# Contains the broadphase systems
+#
+# A broadphase finds the pairs of CollisionBoxes that could be colliding so that the Collision
+# system only has to look at those pairs instead of every box against every other box.
+#
+# SweepAndPrune sorts along x and suits rows of bodies; SpatialHash buckets boxes into a grid
+# and suits bodies spread over both axes.
+
+
+class Endpoint:
+    """One end of the x interval of a CollisionBox"""
+
+    __slots__ = ('value', 'is_min', 'box', 'index')
+
+    def __init__(self, box, is_min):
+        self.value = 0
+        self.is_min = is_min
+        self.box = box
+        self.index = 0
+
+    def key(self):
+        """Ends sort before starts at the same value, so touching boxes do not overlap"""
+        return self.value, self.is_min
+
+
+class SweepAndPrune:
+    """Sweep and prune broadphase over the x intervals of CollisionBoxes
+
+    The endpoints stay sorted between frames. Boxes only move a little each frame, so the
+    insertion sort that restores the order does little work, and every swap of a start past
+    an end is exactly where a pair begins or stops overlapping.
+
+    >>> import pygame
+    >>> class Box(pygame.sprite.Sprite):
+    ...     def __init__(self, left, width):
+    ...         pygame.sprite.Sprite.__init__(self)
+    ...         self.rect = pygame.Rect(left, 0, width, 10)
+    >>> a, b, c = Box(0, 10), Box(5, 10), Box(30, 10)
+    >>> sap = SweepAndPrune()
+    >>> sap.update([a, b, c])
+    >>> sap.collided(a) == [b], sap.collided(c)
+    (True, [])
+    >>> c.rect.left = 12
+    >>> sap.move(c)
+    >>> sap.collided(b) == [a, c], len(sap.candidate_pairs())
+    (True, 2)
+    """
+
+    def __init__(self):
+        self.endpoints = []
+        self.boxes = {}
+        self.pairs = {}
+        self.order = {}
+        self.counter = 0
+
+    def add(self, box):
+        """Adds a box at the end of the endpoint list; the next sort puts it in place"""
+        start, end = Endpoint(box, True), Endpoint(box, False)
+        start.value, end.value = box.rect.left, box.rect.right
+        start.index, end.index = len(self.endpoints), len(self.endpoints) + 1
+        self.endpoints += [start, end]
+        self.boxes[box] = start, end
+        self.pairs[box] = set()
+        self.order[box] = self.counter
+        self.counter += 1
+
+    def remove(self, box):
+        """Removes a box and every pair it belongs to"""
+        for other in self.pairs.pop(box):
+            self.pairs[other].discard(box)
+        del self.boxes[box], self.order[box]
+        self.endpoints = [endpoint for endpoint in self.endpoints if endpoint.box is not box]
+        for index, endpoint in enumerate(self.endpoints):
+            endpoint.index = index
+
+    def update(self, group):
+        """Brings the boxes in line with the group and re-sorts every endpoint"""
+        for box in [box for box in self.boxes if box not in group]:
+            self.remove(box)
+        for box in group:
+            if box not in self.boxes:
+                self.add(box)
+            start, end = self.boxes[box]
+            start.value, end.value = box.rect.left, box.rect.right
+        for index in range(1, len(self.endpoints)):
+            self._shift_left(self.endpoints[index])
+
+    def move(self, box):
+        """Re-sorts only the endpoints of a box whose rect has changed. The end leads when the
+        box moves right and the start when it moves left, so neither is held back by the
+        other end of the same box
+
+        >>> import pygame
+        >>> class Box(pygame.sprite.Sprite):
+        ...     def __init__(self, left, width):
+        ...         pygame.sprite.Sprite.__init__(self)
+        ...         self.rect = pygame.Rect(left, 0, width, 10)
+        >>> a, b, c = Box(0, 10), Box(20, 10), Box(45, 10)
+        >>> sap = SweepAndPrune()
+        >>> sap.update([a, b, c])
+        >>> a.rect.x = 40
+        >>> sap.move(a)
+        >>> [(endpoint.value, endpoint.is_min) for endpoint in sap.endpoints]
+        [(20, True), (30, False), (40, True), (45, True), (50, False), (55, False)]
+        >>> b.rect.x = 38
+        >>> sap.move(b)
+        >>> sap.collided(b) == [a, c]
+        True
+        """
+        start, end = self.boxes[box]
+        moved_right = box.rect.left > start.value
+        start.value, end.value = box.rect.left, box.rect.right
+        for endpoint in (end, start) if moved_right else (start, end):
+            self._shift_left(endpoint)
+            self._shift_right(endpoint)
+
+    def _shift_left(self, endpoint):
+        endpoints = self.endpoints
+        index, key = endpoint.index, endpoint.key()
+        while index > 0 and endpoints[index - 1].key() > key:
+            self._swap(endpoints[index - 1], endpoint)
+            index -= 1
+
+    def _shift_right(self, endpoint):
+        endpoints = self.endpoints
+        index, key = endpoint.index, endpoint.key()
+        while index < len(endpoints) - 1 and endpoints[index + 1].key() < key:
+            self._swap(endpoint, endpoints[index + 1])
+            index += 1
+
+    def _swap(self, left, right):
+        """Moves right in front of left and records the overlap this starts or ends"""
+        self.endpoints[left.index], self.endpoints[right.index] = right, left
+        left.index, right.index = right.index, left.index
+
+        if left.box is right.box:
+            return
+        if right.is_min and not left.is_min:
+            if self._overlap(left.box, right.box):
+                self.pairs[left.box].add(right.box)
+                self.pairs[right.box].add(left.box)
+        elif left.is_min and not right.is_min:
+            self.pairs[left.box].discard(right.box)
+            self.pairs[right.box].discard(left.box)
+
+    def _overlap(self, first, second):
+        first_start, first_end = self.boxes[first]
+        second_start, second_end = self.boxes[second]
+        return first_start.value < second_end.value and second_start.value < first_end.value
+
+    def collided(self, box):
+        """Returns the boxes whose rects collide with the given box, in the order they were added"""
+        collided_lst = [other for other in self.pairs[box] if box.rect.colliderect(other.rect)]
+        return sorted(collided_lst, key=self.order.get)
+
+    def candidate_pairs(self):
+        """Returns every pair of boxes that overlap on x"""
+        return [(box, other) for box, others in self.pairs.items() for other in others
+                if self.order[box] < self.order[other]]
+
+
+class SpatialHash:
+    """Uniform grid broadphase over the rects of CollisionBoxes
+
+    Every box is listed in each square cell of cell_size that its rect covers, so only boxes
+    sharing a cell are tested against each other. A box that moves is only re-listed when the
+    range of cells it covers changes.
+
+    >>> import pygame
+    >>> class Box(pygame.sprite.Sprite):
+    ...     def __init__(self, left, top, size):
+    ...         pygame.sprite.Sprite.__init__(self)
+    ...         self.rect = pygame.Rect(left, top, size, size)
+    >>> a, b, c = Box(0, 0, 10), Box(5, 5, 10), Box(100, 100, 10)
+    >>> grid = SpatialHash(cell_size=32)
+    >>> grid.update([a, b, c])
+    >>> grid.collided(a) == [b], grid.collided(c)
+    (True, [])
+    >>> c.rect.topleft = 12, 12
+    >>> grid.move(c)
+    >>> grid.collided(b) == [a, c], len(grid.candidate_pairs())
+    (True, 3)
+    """
+
+    def __init__(self, cell_size=64):
+        self.cell_size = cell_size
+        self.cells = {}
+        self.boxes = {}
+        self.order = {}
+        self.counter = 0
+
+    def _bounds(self, box):
+        """Returns the first and last column and row of the cells the rect of a box covers"""
+        rect, size = box.rect, self.cell_size
+        return (rect.left // size, rect.top // size,
+                max(rect.right - 1, rect.left) // size, max(rect.bottom - 1, rect.top) // size)
+
+    def _cells(self, bounds):
+        left, top, right, bottom = bounds
+        for column in range(left, right + 1):
+            for row in range(top, bottom + 1):
+                yield column, row
+
+    def _insert(self, box, bounds):
+        self.boxes[box] = bounds
+        for cell in self._cells(bounds):
+            self.cells.setdefault(cell, set()).add(box)
+
+    def _erase(self, box):
+        for cell in self._cells(self.boxes[box]):
+            members = self.cells[cell]
+            members.discard(box)
+            if not members:
+                del self.cells[cell]
+
+    def add(self, box):
+        self._insert(box, self._bounds(box))
+        self.order[box] = self.counter
+        self.counter += 1
+
+    def remove(self, box):
+        self._erase(box)
+        del self.boxes[box], self.order[box]
+
+    def update(self, group):
+        """Brings the boxes in line with the group and re-lists the ones that moved"""
+        for box in [box for box in self.boxes if box not in group]:
+            self.remove(box)
+        for box in group:
+            if box not in self.boxes:
+                self.add(box)
+            else:
+                self.move(box)
+
+    def move(self, box):
+        """Re-lists a box whose rect has changed, if it now covers other cells"""
+        bounds = self._bounds(box)
+        if bounds != self.boxes[box]:
+            self._erase(box)
+            self._insert(box, bounds)
+
+    def collided(self, box):
+        """Returns the boxes whose rects collide with the given box, in the order they were added"""
+        cells = self.cells
+        nearby = set()
+        for cell in self._cells(self.boxes[box]):
+            nearby.update(cells[cell])
+        nearby.discard(box)
+        collided_lst = [other for other in nearby if box.rect.colliderect(other.rect)]
+        return sorted(collided_lst, key=self.order.get)
+
+    def candidate_pairs(self):
+        """Returns every pair of boxes that share a cell"""
+        order = self.order
+        pairs = set()
+        for members in self.cells.values():
+            for box in members:
+                for other in members:
+                    if order[box] < order[other]:
+                        pairs.add((box, other))
+        return sorted(pairs, key=lambda pair: (order[pair[0]], order[pair[1]]))
@@ -0,0 +1,76 @@
+###########################
+### C H E C K P O I N T ###
+###########################
+
+
+# Contains the snapshots of a Simulation
+#
+# A snapshot holds the complete state of a Simulation: every column of its World in one
+# contiguous array, its counters, the predictions of its EventScheduler and the state of its
+# CollisionBudget, including the boxes it carries over to the next step. The CollisionBoxes
+# are not stored because every step rebuilds them from the World before they are used, so
+# restoring a snapshot continues bit for bit the same as the original run.
+
+
+class Snapshot:
+    """The state of a Simulation after a step"""
+
+    __slots__ = ('step', 'world', 'passes', 'resolved', 'scheduler', 'budget')
+
+    def __init__(self, step, world, passes, resolved, scheduler=None, budget=None):
+        self.step = step
+        self.world = world
+        self.passes = passes
+        self.resolved = resolved
+        self.scheduler = scheduler
+        self.budget = budget
+
+
+class SnapshotRing:
+    """The most recent snapshots of a Simulation, taken every few steps, for rewinding
+
+    The arrays of the oldest snapshot are reused for the next one, so once the ring is full
+    taking a snapshot allocates no new arrays.
+
+    >>> from Simulation import Simulation
+    >>> simulation = Simulation(engine='chains')
+    >>> ring = simulation.keep_snapshots(capacity=3, every=10)
+    >>> simulation.run(50) > 0
+    True
+    >>> [snapshot.step for snapshot in ring.snapshots()]
+    [30, 40, 50]
+    >>> ring.rewind(simulation, 35), simulation.steps, len(ring)
+    (30, 30, 1)
+    """
+
+    def __init__(self, capacity=8, every=200):
+        self.capacity = capacity
+        self.every = every
+        self.slots = [None] * capacity
+        self.next = 0
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def take(self, simulation):
+        """Snapshots the simulation into the oldest slot"""
+        self.slots[self.next] = simulation.snapshot(self.slots[self.next])
+        self.next = (self.next + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+
+    def snapshots(self):
+        """Returns the snapshots from the oldest to the newest"""
+        start = self.next - self.size
+        return [self.slots[index % self.capacity] for index in range(start, self.next)]
+
+    def rewind(self, simulation, step=None):
+        """Restores the newest snapshot at or before step, or the newest of all, and forgets the
+        snapshots after it. Returns the step it went back to"""
+        kept = [snapshot for snapshot in self.snapshots() if step is None or snapshot.step <= step]
+        if not kept:
+            raise IndexError('no snapshot at or before step %s' % step)
+        simulation.restore(kept[-1])
+        self.next = (self.next - (self.size - len(kept))) % self.capacity
+        self.size = len(kept)
+        return kept[-1].step
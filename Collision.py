@@ -9,78 +9,420 @@
 # on or more objects.
 
 
-import pygame, operator
+import pygame, numpy
+from time import perf_counter
 from Math import *
 from Vector import *
+from Profiler import profiler
 
-def single_collision(o1, o2):
+def single_collision(o1, o2, cache=None):
+    """Resolves the impact of two circles whose CollisionBoxes overlap, if the circles meet
+    within the next step, or within the reach of the one whose CollisionBox reaches less far
+    when they take substeps. The velocities change along the line between their centres at the
+    time of impact, so bodies in a row along x keep their one-dimensional behaviour. Returns
+    whether there was an impact to resolve. The time of impact is looked up in the cache, a
+    ContactCache, when one is given
+
+    >>> from Entity import Collidable
+    >>> from World import World
+    >>> world = World()
+    >>> o1 = Collidable([0, 0], [10, 10], (0,0,0), None, 1, 1, world)
+    >>> o2 = Collidable([8, 6], [10, 10], (0,0,0), None, 1, 1, world)
+    >>> o1.vel[0].value = 4
+    >>> o1.collision_box(), o2.collision_box()
+    (None, None)
+    >>> single_collision(o1, o2)
+    True
+    >>> numpy.round(world.vel, 6).tolist()
+    [[1.44, -1.92], [2.56, 1.92]]
+    """
     if pygame.sprite.collide_rect(o1.box, o2.box):
-        if o1.pos[0] < o2.pos[0]:
-            left, right = o1, o2
+        c1, c2 = o1.centre, o2.centre
+        v1 = [vel.value for vel in o1.vel]
+        v2 = [vel.value for vel in o2.vel]
+
+        if cache is None:
+            time = time_of_impact(c1, v1, c2, v2, o1.radius + o2.radius)
         else:
-            left, right = o2, o1
+            time = cache.impact_time(o1, o2, c1, v1, c2, v2, o1.radius + o2.radius)
+        if time > min(o1.reach, o2.reach):
+            return False
 
-        # if right.pos[0] - left.pos[0] - Position(1, left.dim[0]) < right.pos[0] + Position(1, right.dim[0]) - left.pos[0]:
-        p1 = right.pos[0].magnitude * right.pos[0].direction
-        p2 = left.pos[0].magnitude * left.pos[0].direction + left.dim[0]
-        # else:
-            # p1 = right.pos[0].magnitude * right.pos[0].direction + right.dim[0]
-            # p2 = left.pos[0].magnitude * left.pos[0].direction
+        c1, c2, v1, v2 = numpy.array(c1), numpy.array(c2), numpy.array(v1), numpy.array(v2)
+        v1f, v2f = collision_velocity_2d(o1.mass, c1 + v1*time, v1, o2.mass, c2 + v2*time, v2)
+        for vel, value in zip(o1.vel, v1f.tolist()):
+            vel.value = value
+        for vel, value in zip(o2.vel, v2f.tolist()):
+            vel.value = value
 
-        v1 = right.vel[0].direction * right.vel[0].magnitude
-        v2 = left.vel[0].direction *  left.vel[0].magnitude
+        o1.collision_box()
+        o2.collision_box()
+        return True
+    return False
 
-        try:
-            time = time_of_collision(p1, v1, p2, v2)
-        except ZeroDivisionError:
-            time = 0
+def distance_squared(box1, box2):
+    """The squared distance between the corners of two CollisionBoxes"""
+    return sum((p1.value - p2.value)**2 for p1, p2 in zip(box1.pos, box2.pos))
+
+class ContactCache:
+    """The colliding boxes of every CollisionBox, sorted by distance, and the times of impact
+    of every pair, kept from one frame to the next
+
+    A box is looked at again only when it or a box it collides with has changed, so in a
+    scene where little moves the cost of a frame follows the number of changed contacts.
+    The results are the same as without the cache.
+
+    >>> from Simulation import Simulation, scenes
+    >>> cached, plain = Simulation(scenes['gas'], contact_cache=True), Simulation(scenes['gas'])
+    >>> cached.run(100) > 0 and plain.run(100) > 0
+    True
+    >>> bool((cached.world.pos == plain.world.pos).all()), cached.resolved == plain.resolved
+    (True, True)
+    """
+
+    def __init__(self):
+        self.keys = {}
+        self.candidates = {}
+        self.dirty = set()
+        self.impacts = {}
+        self.used = {}
+        self.scan = None
+        self.rescans = 0
+
+    @staticmethod
+    def key(box):
+        return tuple(pos.value for pos in box.pos), tuple(box.dim)
+
+    def begin(self, group, scan):
+        """Starts a frame. scan returns the sorted colliding boxes of a box; it is called again
+        for every box that has changed since the last frame"""
+        self.scan = scan
+        for box in [box for box in self.candidates if box not in group]:
+            self.dirty.update(self.candidates.pop(box))
+            del self.keys[box]
+            self.dirty.discard(box)
+        for box in group:
+            if self.keys.get(box) != self.key(box):
+                self.moved(box)
+
+    def _rescan(self, box):
+        self.candidates[box] = self.scan(box)
+        self.keys[box] = self.key(box)
+        self.dirty.discard(box)
+        self.rescans += 1
+
+    def moved(self, box):
+        """Rescans a box that has changed and marks the boxes it collided with and collides
+        with now, whose sorted lists it may have changed"""
+        self.dirty.update(self.candidates.get(box, ()))
+        self._rescan(box)
+        self.dirty.update(self.candidates[box])
+
+    def get(self, box):
+        """Returns the colliding boxes of a box sorted by distance"""
+        if box in self.dirty or box not in self.candidates:
+            self._rescan(box)
+        return self.candidates[box]
+
+    def impact_time(self, o1, o2, c1, v1, c2, v2, distance):
+        """Returns the time_of_impact of two bodies, computing it only when their centres,
+        velocities or sizes differ from the last time the pair was looked at"""
+        pair, state = (o1, o2), (*c1, *v1, *c2, *v2, distance)
+        cached = self.impacts.get(pair)
+        if cached is not None and cached[0] == state:
+            time = cached[1]
+        else:
+            time = time_of_impact(c1, v1, c2, v2, distance)
+        self.used[pair] = state, time
+        return time
 
-        v1f, v2f = collision_velocity(left.mass, left.vel[0], right.mass, right.vel[0])
-        left.vel[0].magnitude = v1f.magnitude
-        left.vel[0].direction = v1f.direction
-        right.vel[0].magnitude = v2f.magnitude
-        right.vel[0].direction = v2f.direction
+    def end(self):
+        """Ends a frame, forgetting the impact times of pairs that were not looked at"""
+        self.impacts, self.used = self.used, {}
 
-        left.collision_box(1 - time)
-        right.collision_box(1 - time)
+
+class CollisionBudget:
+    """A limit on the passes, or on the resolved impacts, that collision may spend in a frame
+
+    When a frame runs out of budget, the boxes that were still resolving impacts in its last
+    pass are left in contact and carried over. The next frame scans them first, in the order
+    they were found. After every frame the budget holds what that frame used: passes,
+    resolved, the residual boxes left in contact, and whether it was exhausted. frames,
+    exhausted_frames and most_passes add up over all frames. A Simulation taking substeps
+    calls collision once a substep, so each substep is a frame with the whole budget.
+
+    >>> from Simulation import Simulation, scenes
+    >>> simulation = Simulation(scenes['gas'], budget=CollisionBudget(passes=1))
+    >>> simulation.run(100) > 0
+    True
+    >>> budget = simulation.budget
+    >>> budget.frames, budget.most_passes, budget.exhausted_frames > 0
+    (100, 1, True)
+    """
+
+    def __init__(self, passes=None, resolutions=None):
+        if passes is not None and passes < 1 or resolutions is not None and resolutions < 1:
+            raise ValueError('a budget must allow at least one pass and one resolution')
+        self.max_passes = passes
+        self.max_resolutions = resolutions
+        self.carried = []
+        self.passes = 0
+        self.resolved = 0
+        self.residual = 0
+        self.exhausted = False
+        self.frames = 0
+        self.exhausted_frames = 0
+        self.most_passes = 0
+
+    def order(self, boxes):
+        """Returns the boxes to scan with the carried over ones first"""
+        if not self.carried:
+            return boxes
+        carried = dict.fromkeys(self.carried)
+        return list(carried) + [box for box in boxes if box not in carried]
+
+    def spent(self, passes, calls):
+        """Returns whether a frame that has taken so many passes and resolved impacts must stop"""
+        return (self.max_passes is not None and passes >= self.max_passes
+                or self.max_resolutions is not None and calls >= self.max_resolutions)
+
+    def end(self, passes, calls, residual):
+        """Records a frame; residual holds the boxes left in contact, in the order they were found"""
+        self.carried = list(dict.fromkeys(residual))
+        self.passes, self.resolved = passes, calls
+        self.residual = len(self.carried)
+        self.exhausted = bool(residual)
+        self.frames += 1
+        self.exhausted_frames += self.exhausted
+        self.most_passes = max(self.most_passes, passes)
+
+    def snapshot(self):
+        """Returns the state of the budget, the carried over boxes included"""
+        return (list(self.carried), self.passes, self.resolved, self.residual, self.exhausted,
+                self.frames, self.exhausted_frames, self.most_passes)
+
+    def restore(self, state):
+        """Puts the budget back in a state returned by snapshot"""
+        carried, self.passes, self.resolved, self.residual, self.exhausted, \
+            self.frames, self.exhausted_frames, self.most_passes = state
+        self.carried = list(carried)
 
 import sys
-def collision(group):
-    no_collision = 0
-    previous_dct = {elem:None for elem in group}
+def collision(group, broadphase=None, poll_events=True, cache=None, active=None, budget=None):
+    """Resolves every collision in the group of CollisionBoxes
 
-    while no_collision != len(group):
-        no_collision = 0
+    The colliding boxes of each box come from pygame.sprite.spritecollide unless a broadphase,
+    such as a SweepAndPrune or SpatialHash, is given, and are kept between frames when a
+    ContactCache is given. Each box resolves the closest of them whose circle it will actually
+    hit, and the passes stop once a whole pass resolves nothing, that is once no pair is
+    approaching within the rest of the step. Window events are only polled when poll_events
+    is set. Returns the number of passes over the group and of resolved impacts.
+
+    When active is given only those boxes, and any box they hit, are scanned; the rest must
+    be standing still, since two boxes without velocity can never hit each other. The
+    broadphase then only re-sorts the active boxes, so the group should hold the same boxes
+    as the last time.
+
+    With a CollisionBudget the passes stop once the budget is spent, even if contacts remain,
+    and those contacts are resolved first in the next frame.
 
-        for elem in group:
+    While the profiler is enabled the scan, sort and single_collision phases are timed and
+    the passes, candidate pairs, single_collision calls and resolved pairs are counted.
 
+    After every step no two circles are left overlapping and approaching each other:
+
+    >>> from Simulation import Simulation, scenes
+    >>> simulation = Simulation(scenes['gas'])
+    >>> world = simulation.world
+    >>> first, second = numpy.triu_indices(world.count, 1)
+    >>> radius = world.dim.sum(1) / 4
+    >>> stuck = 0
+    >>> for _ in range(300):
+    ...     simulation.step()
+    ...     centre = world.pos + world.dim / 2
+    ...     times = time_of_impact(centre[first], world.vel[first], centre[second], world.vel[second], radius[first] + radius[second])
+    ...     stuck += int((times == 0).sum())
+    >>> stuck, simulation.passes < 3 * simulation.steps
+    (0, True)
+    """
+    no_collision = 0
+    passes, calls = 0, 0
+    timing = profiler.enabled
+    active = list(group) if active is None else list(active)
+    if budget is not None:
+        active = budget.order(active)
+    scanning = set(active)
+    exhausted = False
+
+    if broadphase is not None:
+        if len(active) == len(group) or len(broadphase.boxes) != len(group):
+            broadphase.update(group)
+        else:
+            for elem in active:
+                broadphase.move(elem)
+
+    def scan(elem):
+        """Returns the boxes colliding with elem, closest first"""
+        if timing:
+            start = perf_counter()
+        if broadphase is None:
             collided_lst = pygame.sprite.spritecollide(elem, group, False)
+        else:
+            collided_lst = broadphase.collided(elem)
+        if timing:
+            profiler.add_time('scan', perf_counter() - start)
+
+        try:
+            collided_lst.remove(elem)
+        except ValueError:
+            pass
+
+        if timing:
+            start = perf_counter()
+        collided_dct = {collided:distance_squared(elem, collided) for collided in collided_lst}# change later to time not closest position
+        collided_sorted_lst = sorted(collided_dct, key=collided_dct.get)
+        if timing:
+            profiler.add_time('sort', perf_counter() - start)
+        return collided_sorted_lst
 
-            try:
-                collided_lst.remove(elem)
-            except ValueError:
-                pass
+    if cache is not None:
+        cache.begin(group, scan)
+
+    while no_collision != len(active) and not exhausted:
+        no_collision = 0
+        passes += 1
+        resolving = []
 
-            try:
-                possible_collide = previous_dct[elem]
-                collided_lst.remove(possible_collide)
-                previous_dct[possible_collide] = elem
-            except ValueError:
-                pass
+        for elem in active:
 
+            collided_lst = scan(elem) if cache is None else list(cache.get(elem))
+
+            closest_collided = None
             if len(collided_lst) > 0:
-                collided_dct = {collided:abs(elem.pos[0] - collided.pos[0]) for collided in collided_lst}# change later to time not closest position
-                collided_sorted_lst = sorted(collided_dct.items(), key=operator.itemgetter(1))
-                closest_collided = collided_sorted_lst[0][0]
+                if timing:
+                    profiler.count('candidate_pairs', len(collided_lst))
+
+                with profiler.phase('single_collision'):
+                    tried = 0
+                    for collided in collided_lst:
+                        tried += 1
+                        if single_collision(elem.parent, collided.parent, cache):
+                            closest_collided = collided
+                            break
+                if timing:
+                    profiler.count('single_collision_calls', tried)
 
-                single_collision(elem.parent, closest_collided.parent)
+            if closest_collided is not None:
+                calls += 1
+                if broadphase is not None:
+                    broadphase.move(elem)
+                    broadphase.move(closest_collided)
+                if cache is not None:
+                    cache.moved(elem)
+                    cache.moved(closest_collided)
 
-                previous_dct[closest_collided] = elem
+                if closest_collided not in scanning:
+                    scanning.add(closest_collided)
+                    active.append(closest_collided)
+                resolving += (elem, closest_collided)
 
                 no_collision = 0
+                if budget is not None and budget.max_resolutions is not None and calls >= budget.max_resolutions:
+                    exhausted = True
+                    break
             else:
                 no_collision += 1
 
-        for event in pygame.event.get():
-            if event.type == pygame.QUIT or pygame.key.get_pressed()[pygame.K_ESCAPE]:
-                sys.exit()
\ No newline at end of file
+        if budget is not None and no_collision != len(active) and budget.spent(passes, calls):
+            exhausted = True
+
+        if poll_events:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT or pygame.key.get_pressed()[pygame.K_ESCAPE]:
+                    sys.exit()
+
+    if cache is not None:
+        cache.end()
+    if budget is not None:
+        budget.end(passes, calls, resolving if exhausted else ())
+    if timing:
+        profiler.count('passes', passes)
+        profiler.count('resolved_pairs', calls)
+    return passes, calls
+
+
+def contact_pairs(world, rows):
+    """Returns the rows sorted along x and the gap along x between each neighbouring pair
+
+    >>> from World import World
+    >>> world = World()
+    >>> for x in (0, 10, 30):
+    ...     _ = world.add(None, [x, 0], [10, 10], 1, 1, movable=True)
+    >>> order, gap = contact_pairs(world, numpy.arange(3))
+    >>> order.tolist(), gap.tolist()
+    ([0, 1, 2], [0.0, 10.0])
+    """
+    order = rows[numpy.argsort(world.pos[rows, 0], kind='stable')]
+    left, right = order[:-1], order[1:]
+    return order, world.pos[right, 0] - world.pos[left, 0] - world.dim[left, 0]
+
+
+def resolve_chains(world, rows=None, time=1, max_sweeps=None):
+    """Resolves every chain of touching bodies in the World together
+
+    The pairs of a chain are resolved in two alternating halves, even pairs then odd pairs, so
+    that no body is in two pairs at once. Each half is one call of collision_velocity over the
+    arrays of all approaching pairs in every chain. Which neighbours touch and approach is
+    worked out again before each half, so a pair that only starts approaching once an earlier
+    half has changed its velocities is still resolved. The velocities are written back to the
+    World once at the end. Sweeps stop when no touching pair is approaching or when
+    max_sweeps is reached; any pair left approaching is resolved in the next frame.
+    Returns the number of sweeps used and of pair resolutions.
+
+    >>> from World import World
+    >>> world = World()
+    >>> for x in (0, 10, 20, 30):
+    ...     _ = world.add(None, [x, 0], [10, 10], 1, 1, movable=True)
+    >>> world.vel[0, 0] = 10
+    >>> resolve_chains(world)
+    (2, 3)
+    >>> world.vel[:, 0].tolist()
+    [0.0, 0.0, 0.0, 10.0]
+
+    A pair that is apart until an earlier impact sets it moving is resolved in the same step
+
+    >>> world = World()
+    >>> for x in (0, 10, 21):
+    ...     _ = world.add(None, [x, 0], [10, 10], 1, 1, movable=True)
+    >>> world.vel[0, 0] = 10
+    >>> resolve_chains(world), world.vel[:, 0].tolist()
+    ((1, 2), [0.0, 0.0, 10.0])
+    """
+    rows = numpy.flatnonzero(world.movable) if rows is None else numpy.asarray(rows)
+    if len(rows) < 2:
+        return 0, 0
+    order, gap = contact_pairs(world, rows)
+    left_all, right_all = order[:-1], order[1:]
+    parities = numpy.arange(len(gap)) % 2
+    vel = world.vel[:, 0].copy()
+    mass = world.mass
+
+    def approaching():
+        """Returns which neighbours touch, or will within the time, and are approaching"""
+        closing = vel[left_all] - vel[right_all]
+        return (closing > 0) & (gap <= closing * time)
+
+    sweeps, resolved = 0, 0
+    while max_sweeps is None or sweeps < max_sweeps:
+        chosen = approaching()
+        if not chosen.any():
+            break
+        for parity in (0, 1):
+            chosen = approaching() & (parities == parity)
+            left, right = left_all[chosen], right_all[chosen]
+            resolved += len(left)
+            vel[left], vel[right] = collision_velocity(mass[left], vel[left], mass[right], vel[right])
+        sweeps += 1
+
+    world.vel[:, 0] = vel
+    return sweeps, resolved
@@ -12,6 +12,8 @@
 # work
 
 
+import numpy
+
 from Vector import *
 
 
@@ -51,6 +53,15 @@ class Energy:#(dict):
         #self['kinetic'] = self.get('kinetic', 0) + result
         return result
 
+    def calc_total_kinetic(self, mass, velocity):
+        """Calculates the total Kinetic Energy of many objects in one pass, from an array of
+        masses and an array with the velocity of each object along every axis
+
+        >>> Energy().calc_total_kinetic(numpy.array([5, 2]), numpy.array([[-10, 0], [3, 4]]))
+        275.0
+        """
+        return .5 * float(numpy.einsum('i,ij,ij->', mass, velocity, velocity))
+
     def calc_potential(self):
         """This is a place holder:
         One could calculate the Energy in an object the moment a force is acting on it.
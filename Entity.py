@@ -16,57 +16,162 @@ import pygame, math, random
 from Vector import *
 from Energy import *
 from Math import *
+from World import *
 
 
 class Entity(pygame.sprite.Sprite):
-    """This is the default entity class"""
+    """This is the default entity class
 
-    def __init__(self, pos, dim, color, surface, mass, tensile_strength):
+    The physical state lives in a row of a World; pos and vel are Vectors bound to that row.
+    """
+
+    world = World()
+    movable = False
+
+    def __init__(self, pos, dim, color, surface, mass, tensile_strength, world=None):
         pygame.sprite.Sprite.__init__(self)
-        self.pos = [Vector.create_vector("Position", elem) for elem in pos]
-        self.dim = list(dim)
+        if world is not None:
+            self.world = world
+        self.row = self.world.add(self, pos, dim, mass, tensile_strength, self.movable)
+        self._bind(color, surface)
+
+    def _bind(self, color, surface):
+        """Sets up everything other than the World row, which the entity already has"""
+        self._pos = [BoundPosition(self.world, '_pos', self.row, axis) for axis in range(self.world.axes)]
+        self._vel = [BoundVelocity(self.world, '_vel', self.row, axis) for axis in range(self.world.axes)]
         self.color = list(color)
         self.surface = surface
-        self.mass = mass
-        self.vel = [Velocity(0, 0), Velocity(0, 0)]
-        self.tensile_strength = tensile_strength # temporary
+
+    @classmethod
+    def from_row(cls, world, row, color, surface=None):
+        """Creates the entity of a body that is already stored in a row of the World, such as
+        one loaded in bulk, without running the constructors of its subclasses
+
+        >>> world = World()
+        >>> world.extend([[5, 0]], [[10, 10]], [1], [1], [True], vel=[[3, 0]])
+        range(0, 1)
+        >>> orb = Collidable.from_row(world, 0, (255, 0, 0))
+        >>> world.entities[0] is orb, orb.vel[0].value, orb.box.parent is orb
+        (True, 3.0, True)
+        """
+        entity = cls.__new__(cls)
+        pygame.sprite.Sprite.__init__(entity)
+        entity.world = world
+        entity.row = row
+        entity._bind(color, surface)
+        world.entities[row] = entity
+        return entity
+
+    @property
+    def pos(self):
+        return self._pos
+
+    @pos.setter
+    def pos(self, value):
+        self.world._pos[self.row] = [elem.value for elem in value]
+
+    @property
+    def vel(self):
+        return self._vel
+
+    @vel.setter
+    def vel(self, value):
+        self.world._vel[self.row] = [elem.value for elem in value]
+
+    @property
+    def dim(self):
+        """The dim as Python floats, so dividing by a zero dim raises as it did before the World
+
+        >>> Entity([0, 0], [10, 20], (0,0,0), None, 1, 1, World()).dim
+        [10.0, 20.0]
+        """
+        return self.world._dim[self.row].tolist()
+
+    @property
+    def mass(self):
+        return float(self.world._mass[self.row])
+
+    @mass.setter
+    def mass(self, value):
+        self.world._mass[self.row] = value
+
+    @property
+    def tensile_strength(self): # temporary
+        return float(self.world._tensile_strength[self.row])
+
+    @tensile_strength.setter
+    def tensile_strength(self, value):
+        self.world._tensile_strength[self.row] = value
 
     def point_on_edge(self, slope, point):
         """This returns a point on the edge that is intersected by the given line"""
         return 0, 0
 
+    def move(self, size=None, frames=None):
+        """The physics phase; entities that do not move have nothing to do"""
+
+    def draw_pos(self, alpha=1):
+        """The position to draw at, alpha of the way from the previous physics step"""
+        return self.world.interpolate(alpha, self.row).tolist()
+
+    def draw_rect(self, alpha=1):
+        """The screen area the entity covers when drawn at draw_pos"""
+        return pygame.Rect([round(pos) for pos in self.draw_pos(alpha)], self.dim)
+
 
 class Box(Entity):
     """Anything that appears on screen as a rectangle will be a descendent of this class"""
 
-    def draw(self, size=None, frames=None):
-        self.rect = pygame.Rect([round(pos.direction*pos.magnitude) for pos in self.pos], self.dim)
+    def draw(self, size=None, frames=None, alpha=1):
+        self.rect = self.draw_rect(alpha)
         pygame.draw.rect(self.surface, self.color, self.rect)
 
 
 class Orb(Entity):
     """Anything that appears on screen as a circle will be a descendent of this class"""
 
+    @property
+    def radius(self):
+        return sum(self.dim)/4
+
+    @property
+    def centre(self):
+        """The centre of the circle; pos is the top left corner of its square"""
+        return [pos.value + dim/2 for pos, dim in zip(self.pos, self.dim)]
+
     def point_on_edge(self, slope, point):
-        """This is for circles only"""
-        y_inter = point[1] - s1 * point[0]
-        h, k = [round(pos.direction*pos.magnitude + self.radius) for pos in self.pos]
-        a = m**2 + 1
-        b = 2*(m*(y_inter-k) - h)
+        """This returns the two points where the line of the given slope through point crosses
+        the circle, or None if it misses
+
+        >>> orb = Orb([0, 0], [20, 20], (0,0,0), None, 1, 1, World())
+        >>> orb.point_on_edge(0, (0, 10))
+        ((20.0, 10.0), (0.0, 10.0))
+        >>> orb.point_on_edge(1, (0, 30)) is None
+        True
+        """
+        y_inter = point[1] - slope * point[0]
+        h, k = self.centre
+        a = slope**2 + 1
+        b = 2*(slope*(y_inter-k) - h)
         c = (y_inter-k)**2 - self.radius**2 + h**2
-        x1, x2 = (-b + (b**2 - 4*a*c)**(1/2))/(2*a), (-b - (b**2 - 4*a*c)**(1/2))/(2*a)
+        discriminant = b**2 - 4*a*c
+        if discriminant < 0:
+            return None
+        x1, x2 = (-b + discriminant**(1/2))/(2*a), (-b - discriminant**(1/2))/(2*a)
         y1, y2 = x1 * slope + y_inter, x2 * slope + y_inter
         return (x1, y1), (x2, y2)
 
-    def draw(self, size=None, frames=None):
-        self.rect = pygame.Rect([round(pos.direction*pos.magnitude) for pos in self.pos], self.dim)
-        self.radius = sum(self.dim)/4
-        pygame.draw.circle(self.surface, self.color, [round(pos.direction*pos.magnitude + self.radius) for pos in self.pos], round(self.radius))
+    def draw(self, size=None, frames=None, alpha=1):
+        draw_pos = self.draw_pos(alpha)
+        self.rect = self.draw_rect(alpha)
+        pygame.draw.circle(self.surface, self.color, [round(pos + self.radius) for pos in draw_pos], round(self.radius))
 
 
 class MovingOrb(Orb):
     """This is a circle that moves"""
 
+    movable = True
+
     def calc_position(self, time=1):
         """This calculates the position of this object a certain time later or earlier
 
@@ -81,11 +186,7 @@ class MovingOrb(Orb):
         return [vel.calc_position(time) + pos for vel, pos in zip(self.vel, self.pos)]
 
     def move(self, size=None, frames=None):
-        self.pos = self.calc_position()
-
-    def draw(self, size=None, frames=None):
-        self.move(size, frames)
-        super().draw(size, frames)
+        self.world.move_row(self.row)
 
 
 class CollisionBox(pygame.sprite.Sprite):
@@ -93,45 +194,78 @@ class CollisionBox(pygame.sprite.Sprite):
 
     entity_group = pygame.sprite.Group()#[]
 
-    def __init__(self, pos, dim, color, surface):
+    def __init__(self, pos, dim, color, surface, group=None):
         pygame.sprite.Sprite.__init__(self)
-        self.pos = [Vector.create_vector("Position", elem) for elem in pos]
+        self.pos = [Vector.create_vector(Position, elem) for elem in pos]
         self.dim = list(dim)
         self.color = list(color)
         self.surface = surface
         self.parent = None
-        self.entity_group.add(self)
+        (self.entity_group if group is None else group).add(self)
 
     def draw(self):
-        self.rect = pygame.Rect([round(pos.direction*pos.magnitude) for pos in self.pos], self.dim)
+        """Sets the rect to the whole pixels that cover the box, so that it never misses an overlap"""
+        left = [math.floor(pos.direction*pos.magnitude) for pos in self.pos]
+        right = [math.ceil(pos.direction*pos.magnitude + dim) for pos, dim in zip(self.pos, self.dim)]
+        self.rect = pygame.Rect(left, [end - start for start, end in zip(left, right)])
         # pygame.draw.rect(self.surface, (random.randint(0,255),random.randint(0,255),random.randint(0,255)), self.rect)
 
 
 class Collidable(MovingOrb):
-    """A circle that is collidable"""
+    """A circle that is collidable
+
+    reach is the time ahead its CollisionBox is stretched over: the time step, or one
+    substep of it for a body taking substeps.
+    """
+
+    reach = 1
 
-    def __init__(self, pos, dim, color, surface, mass, tensile_strength):
-        super().__init__(pos, dim, color, surface, mass, tensile_strength)
-        self.box = CollisionBox(pos, dim, color, surface)
+    def _bind(self, color, surface):
+        super()._bind(color, surface)
+        self.box = CollisionBox([pos.value for pos in self.pos], self.dim, color, surface, self.collision_group(self.world))
         self.box.parent = self
 
+    @staticmethod
+    def collision_group(world):
+        """Returns the group of CollisionBoxes of a World; the default World uses the
+        class level CollisionBox.entity_group"""
+        if world is Entity.world:
+            return CollisionBox.entity_group
+        return world.groups.setdefault('collision', pygame.sprite.Group())
+
     def collision_box(self, scale=1):
-        pos_value = self.pos[0].magnitude * self.pos[0].direction
-
-        if self.vel[0].direction == 1:
-            self.box.pos[0] = Vector.create_vector("Position", pos_value)
-            self.box.dim[0] = self.vel[0].magnitude + self.dim[0]*scale
-        elif self.vel[0].direction == -1:
-            self.box.pos[0] = Vector.create_vector("Position", pos_value - self.vel[0].magnitude*scale)
-            self.box.dim[0] = self.vel[0].magnitude + self.dim[0]*scale
-        else:
-            self.box.pos[0] = Vector.create_vector("Position", pos_value)
-            self.box.dim[0] = self.dim[0]
+        """Stretches the CollisionBox over the motion of the next step, or of the reach, on every axis
+
+        >>> orb = Collidable([0, 0], [10, 10], (0,0,0), None, 1, 1, World())
+        >>> orb.vel[0].value, orb.vel[1].value = 5, -3
+        >>> orb.collision_box()
+        >>> orb.box.rect
+        <rect(0, -3, 15, 13)>
+        >>> orb.reach = 0.5
+        >>> orb.collision_box()
+        >>> orb.box.rect
+        <rect(0, -2, 13, 12)>
+        """
+        dim = self.dim
+        reach = self.reach
+        for axis, (pos, vel) in enumerate(zip(self.pos, self.vel)):
+            pos_value = pos.magnitude * pos.direction
+            travel = vel.magnitude * reach
+
+            if vel.direction == 1:
+                self.box.pos[axis] = Vector.create_vector(Position, pos_value)
+                self.box.dim[axis] = travel + dim[axis]*scale
+            elif vel.direction == -1:
+                self.box.pos[axis] = Vector.create_vector(Position, pos_value - travel*scale)
+                self.box.dim[axis] = travel + dim[axis]*scale
+            else:
+                self.box.pos[axis] = Vector.create_vector(Position, pos_value)
+                self.box.dim[axis] = dim[axis]
 
         self.box.draw()
 
-    def draw(self, size=None, fps=None):
-        super().draw()
+    def move(self, size=None, frames=None):
+        super().move(size, frames)
         self.collision_box()
 
 
@@ -160,34 +294,34 @@ class Character(MovingOrb):
 class Orb0(Collidable):
     """This is a circle that moves"""
 
-    def __init__(self, pos, dim, color, surface, mass, tensile_strength):
-        super().__init__(pos, dim, color, surface, mass, tensile_strength)
+    def __init__(self, pos, dim, color, surface, mass, tensile_strength, world=None):
+        super().__init__(pos, dim, color, surface, mass, tensile_strength, world)
         self.vel[0].direction, self.vel[0].magnitude = 0, 0
 
 
 class Orb1(Collidable):
     """This is a circle that moves"""
-    def __init__(self, pos, dim, color, surface, mass, tensile_strength):
-        super().__init__(pos, dim, color, surface, mass, tensile_strength)
+    def __init__(self, pos, dim, color, surface, mass, tensile_strength, world=None):
+        super().__init__(pos, dim, color, surface, mass, tensile_strength, world)
         self.vel[0].direction, self.vel[0].magnitude = 1, 10
 
 
 class Orb2(Collidable):
     """This is a circle that moves"""
-    def __init__(self, pos, dim, color, surface, mass, tensile_strength):
-        super().__init__(pos, dim, color, surface, mass, tensile_strength)
+    def __init__(self, pos, dim, color, surface, mass, tensile_strength, world=None):
+        super().__init__(pos, dim, color, surface, mass, tensile_strength, world)
         self.vel[0].direction, self.vel[0].magnitude = 0, 0
 
 
 class Orb3(Collidable):
     """This is a circle that moves"""
-    def __init__(self, pos, dim, color, surface, mass, tensile_strength):
-        super().__init__(pos, dim, color, surface, mass, tensile_strength)
+    def __init__(self, pos, dim, color, surface, mass, tensile_strength, world=None):
+        super().__init__(pos, dim, color, surface, mass, tensile_strength, world)
         self.vel[0].direction, self.vel[0].magnitude = 0, 0
 
 
 class Orb4(Collidable):
     """This is a circle that moves"""
-    def __init__(self, pos, dim, color, surface, mass, tensile_strength):
-        super().__init__(pos, dim, color, surface, mass, tensile_strength)
+    def __init__(self, pos, dim, color, surface, mass, tensile_strength, world=None):
+        super().__init__(pos, dim, color, surface, mass, tensile_strength, world)
         self.vel[0].direction, self.vel[0].magnitude = 0, 0
\ No newline at end of file
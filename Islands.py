@@ -0,0 +1,125 @@
+#####################
+### I S L A N D S ###
+#####################
+
+
+# Contains the contact islands
+#
+# Boxes that do not overlap, directly or through a chain of other boxes, cannot affect each
+# other this frame. The island builder joins every overlapping pair with union find, and each
+# island runs the passes of collision on its own, so a busy cluster only repeats passes over
+# its own boxes and a box touching nothing is never looked at.
+#
+# The islands are resolved one after another. The passes are Python code on pygame sprites,
+# so threads would only take turns holding the interpreter lock, and shipping an island to
+# another process costs more than resolving it. Sweep.py spreads whole Simulations over
+# processes instead.
+
+
+import pygame
+
+from Collision import *
+
+
+class UnionFind:
+    """Disjoint sets of the numbers 0 to size - 1
+
+    >>> sets = UnionFind(5)
+    >>> sets.union(0, 1), sets.union(3, 4), sets.union(1, 0)
+    (True, True, False)
+    >>> sets.groups()
+    [[0, 1], [2], [3, 4]]
+    """
+
+    def __init__(self, size):
+        self.parent = list(range(size))
+        self.size = [1] * size
+
+    def find(self, item):
+        parent = self.parent
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    def union(self, first, second):
+        """Joins the sets of two items and returns whether they were apart"""
+        first, second = self.find(first), self.find(second)
+        if first == second:
+            return False
+        if self.size[first] < self.size[second]:
+            first, second = second, first
+        self.parent[second] = first
+        self.size[first] += self.size[second]
+        return True
+
+    def groups(self):
+        """Returns the items of every set, in the order of their smallest item"""
+        groups = {}
+        for item in range(len(self.parent)):
+            groups.setdefault(self.find(item), []).append(item)
+        return list(groups.values())
+
+
+def overlapping_pairs(boxes, broadphase=None):
+    """Returns the indices in boxes of every pair whose rects collide, using the candidate
+    pairs of the broadphase when one is given"""
+    index = {box: number for number, box in enumerate(boxes)}
+    if broadphase is not None:
+        broadphase.update(boxes)
+        return [(index[box], index[other]) for box, other in broadphase.candidate_pairs()
+                if box.rect.colliderect(other.rect)]
+    rects = [box.rect for box in boxes]
+    pairs = []
+    for number, rect in enumerate(rects):
+        pairs.extend((number, other) for other in rect.collidelistall(rects) if other > number)
+    return pairs
+
+
+def build_islands(boxes, broadphase=None):
+    """Returns the islands of boxes that overlap directly or through other boxes, leaving
+    out boxes that overlap nothing
+
+    >>> class Box(pygame.sprite.Sprite):
+    ...     def __init__(self, left, width):
+    ...         pygame.sprite.Sprite.__init__(self)
+    ...         self.rect = pygame.Rect(left, 0, width, 10)
+    >>> boxes = [Box(0, 10), Box(5, 10), Box(12, 10), Box(50, 10), Box(80, 10), Box(85, 10)]
+    >>> [[boxes.index(box) for box in island] for island in build_islands(boxes)]
+    [[0, 1, 2], [4, 5]]
+    """
+    boxes = list(boxes)
+    sets = UnionFind(len(boxes))
+    for first, second in overlapping_pairs(boxes, broadphase):
+        sets.union(first, second)
+    return [[boxes[number] for number in group] for group in sets.groups() if len(group) > 1]
+
+
+def resolve_islands(group, broadphase=None, active=None):
+    """Resolves every collision in the group of CollisionBoxes one island at a time
+
+    Resolving an island can stretch its boxes over boxes of another island, so the islands
+    are built again afterwards and any that joined are resolved again together. When active
+    is given, islands without any of those boxes are taken to be standing still and left
+    alone. Returns the number of passes, summed over the islands, and of resolved impacts.
+
+    >>> from Simulation import Simulation, scenes
+    >>> simulation = Simulation(scenes['gas'], engine='islands')
+    >>> monitor = simulation.watch_conservation(every=10, tolerance=1e-9)
+    >>> simulation.run(100) > 0, simulation.resolved > 0
+    (True, True)
+    """
+    passes, calls = 0, 0
+    islands = build_islands(group, broadphase)
+    if active is not None:
+        active = set(active)
+        islands = [island for island in islands if not active.isdisjoint(island)]
+    while islands:
+        results = [collision(pygame.sprite.Group(island), poll_events=False) for island in islands]
+        passes += sum(result[0] for result in results)
+        calls += sum(result[1] for result in results)
+
+        resolved_in = {box: number for number, island in enumerate(islands) for box in island}
+        islands = [island for island in build_islands(group, broadphase)
+                   if len({resolved_in.get(box) for box in island}) > 1]
+    return passes, calls
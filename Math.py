@@ -8,10 +8,97 @@
 # These math functions create easy abstractions to remove unnecessary calculations.
 
 
+import ast, functools
+
+import numpy
+
+
+class _ElementWise(ast.NodeTransformer):
+    """Rewrites a condition so that it gives a mask when its variable is an array: and, or
+    and not become numpy.logical_and, logical_or and logical_not, which take the truth of
+    each element as and, or and not do, and chained comparisons become one comparison per
+    pair. Conditions that have no element wise form are refused with a ValueError"""
+
+    def visit_BoolOp(self, node):
+        self.generic_visit(node)
+        name = 'logical_and' if isinstance(node.op, ast.And) else 'logical_or'
+        result = node.values[0]
+        for value in node.values[1:]:
+            result = _numpy_call(name, result, value)
+        return result
+
+    def visit_UnaryOp(self, node):
+        self.generic_visit(node)
+        if isinstance(node.op, ast.Not):
+            return _numpy_call('logical_not', node.operand)
+        return node
+
+    def visit_IfExp(self, node):
+        raise ValueError('conditional expressions are not supported in conditions')
+
+    def visit_Compare(self, node):
+        self.generic_visit(node)
+        for op in node.ops:
+            if isinstance(op, (ast.In, ast.NotIn, ast.Is, ast.IsNot)):
+                raise ValueError(type(op).__name__ + ' is not supported in conditions')
+        if len(node.ops) == 1:
+            return node
+        operands = [node.left] + node.comparators
+        result = None
+        for left, op, right in zip(operands, node.ops, operands[1:]):
+            pair = ast.Compare(left=left, ops=[op], comparators=[right])
+            result = pair if result is None else _numpy_call('logical_and', result, pair)
+        return result
+
+
+def _numpy_call(name, *args):
+    return ast.Call(func=ast.Attribute(value=ast.Name(id='numpy', ctx=ast.Load()), attr=name, ctx=ast.Load()),
+                    args=list(args), keywords=[])
+
+
+@functools.lru_cache(maxsize=None)
+def compile_condition(variable, source):
+    """Compiles a boolean string into a function of the variable, and a second function that
+    gives the mask of an array. Both are cached by the variable and source
+
+    >>> scalar, array = compile_condition('x', '0 < x <= 2 and not x == 1')
+    >>> scalar(2), array(numpy.arange(4)).tolist()
+    (True, [False, False, True, False])
+
+    Bare operands count by their truth, as they do for a scalar
+
+    >>> values = [0, 1, 2, 3]
+    >>> for source in ('not x', 'x', 'x > 1 and x', 'x < 1 or not x - 2'):
+    ...     scalar, array = compile_condition('x', source)
+    ...     print(source, [bool(scalar(value)) for value in values] == array(numpy.array(values)).tolist())
+    not x True
+    x True
+    x > 1 and x True
+    x < 1 or not x - 2 True
+    >>> compile_condition('x', 'x in (1, 2)')
+    Traceback (most recent call last):
+    ...
+    ValueError: In is not supported in conditions
+    """
+    expression = ast.parse(source, mode='eval')
+    element_wise = ast.fix_missing_locations(_ElementWise().visit(ast.parse(source, mode='eval')))
+    element_wise.body = ast.Call(func=ast.Attribute(value=ast.Name(id='numpy', ctx=ast.Load()), attr='asarray', ctx=ast.Load()),
+                                 args=[element_wise.body], keywords=[ast.keyword(arg='dtype', value=ast.Name(id='bool', ctx=ast.Load()))])
+    arguments = ast.arguments(posonlyargs=[], args=[ast.arg(arg=variable)], kwonlyargs=[], kw_defaults=[], defaults=[])
+    functions = []
+    for tree in (expression, element_wise):
+        function = ast.Expression(body=ast.Lambda(args=arguments, body=tree.body))
+        functions.append(eval(compile(ast.fix_missing_locations(function), '<' + source + '>', 'eval'), globals()))
+    return tuple(functions)
+
+
 def piecewise_func(variable, *args):
     """Takes in an variable name and a list of (boolean strings, functions)
     and returns a resulting piecewise function that takes in one variable 
-    given by the parameter variable.
+    given by the parameter variable. The boolean strings are compiled once.
+
+    Given an array, each branch is applied once to the elements where its condition is
+    the first to hold, and the results are gathered into one array.
 
     >>> pw_function = piecewise_func('x', 
     ...     ('x < 10', lambda x: 'less than 10'), 
@@ -24,14 +111,39 @@ def piecewise_func(variable, *args):
     'equal to 10'
     >>> pw_function(11)
     'greater than 10'
+    >>> pw_function(numpy.array([9, 10, 11])).tolist()
+    ['less than 10', 'equal to 10', 'greater than 10']
+    >>> speed = piecewise_func('t', ('t < 2', lambda t: 5 * t), ('2 <= t', lambda t: 10 + 0 * t))
+    >>> speed(numpy.array([0.0, 1.0, 3.0])).tolist()
+    [0.0, 5.0, 10.0]
+    >>> sign = piecewise_func('x', ('not x', lambda x: 0 * x), ('x > 0 and x', lambda x: 1 + 0 * x), ('x < 0', lambda x: -1 + 0 * x))
+    >>> [sign(x) for x in (-2, 0, 3)], sign(numpy.array([-2, 0, 3])).tolist()
+    ([-1, 0, 1], [-1, 0, 1])
     """
+    branches = [compile_condition(variable, interval) + (func,) for interval, func in args]
+    missing = 'func(' + variable + ') does not exist'
+
     def result_func(t):
-        """If string eval to True, it returns the respective function called on t"""
-        locals()[variable] = t
-        for interval, func in args:
-            if eval(interval):
-                return func(t)
-        assert False, 'func(' + variable + ') does not exist'
+        """Returns the function of the first branch whose condition holds called on t"""
+        if not (isinstance(t, numpy.ndarray) and t.ndim):
+            for condition, _, func in branches:
+                if condition(t):
+                    return func(t)
+            raise AssertionError(missing)
+
+        remaining = numpy.ones(t.shape, dtype=bool)
+        parts = []
+        for _, condition, func in branches:
+            mask = numpy.broadcast_to(condition(t), t.shape) & remaining
+            if mask.any():
+                parts.append((mask, numpy.broadcast_to(func(t[mask]), (int(mask.sum()),))))
+                remaining &= ~mask
+        if remaining.any():
+            raise AssertionError(missing)
+        result = numpy.empty(t.shape, dtype=numpy.result_type(*[values for _, values in parts]) if parts else float)
+        for mask, values in parts:
+            result[mask] = values
+        return result
     return result_func
 
 def collision_velocity(m1, v1, m2, v2):
@@ -39,11 +151,39 @@ def collision_velocity(m1, v1, m2, v2):
 
     >>> collision_velocity(8, 6, 4, -3)
     (0.0, 9.0)
+
+    Arrays of masses and velocities give the velocities of every pair at once
+
+    >>> import numpy
+    >>> v1f, v2f = collision_velocity(numpy.array([8, 1]), numpy.array([6, 2]), numpy.array([4, 1]), numpy.array([-3, 0]))
+    >>> v1f.tolist(), v2f.tolist()
+    ([0.0, 0.0], [9.0, 2.0])
     """
     v1f = v1*((m1-m2)/(m1+m2)) + v2*((2*m2)/(m1+m2))
     v2f = v1*((2*m1)/(m1+m2)) + v2*((m2-m1)/(m1+m2))
     return v1f, v2f
 
+def collision_velocity_2d(m1, p1, v1, m2, p2, v2):
+    """Calculates the final velocities of two circles in an elastic collision. The centres
+    p1 and p2 give the line of impact; only the velocity along it changes. Arrays with one
+    pair per row give the velocities of every pair at once
+
+    >>> import numpy
+    >>> v1f, v2f = collision_velocity_2d(1, numpy.array([0, 0]), numpy.array([10, 0]), 1, numpy.array([10, 0]), numpy.array([0, 0]))
+    >>> v1f.tolist(), v2f.tolist()
+    ([0.0, 0.0], [10.0, 0.0])
+    >>> v1f, v2f = collision_velocity_2d(1, numpy.array([0, 0]), numpy.array([10, 0]), 1, numpy.array([3, 4]), numpy.array([0, 0]))
+    >>> numpy.round(v1f, 6).tolist(), numpy.round(v2f, 6).tolist()
+    ([6.4, -4.8], [3.6, 4.8])
+    """
+    normal = p2 - p1
+    normal = normal / numpy.linalg.norm(normal, axis=-1, keepdims=True)
+    u1, u2 = (v1 * normal).sum(-1), (v2 * normal).sum(-1)
+    u1f, u2f = collision_velocity(m1, u1, m2, u2)
+    v1f = v1 - u1[..., None] * normal + u1f[..., None] * normal
+    v2f = v2 - u2[..., None] * normal + u2f[..., None] * normal
+    return v1f, v2f
+
 def time_of_collision(p1, v1, p2, v2):
     """This calculates the time at which the objects intersect. This is a more
     complex version of distance = rate * time
@@ -57,6 +197,32 @@ def time_of_collision(p1, v1, p2, v2):
 
     return distance/rate
 
+def time_of_impact(p1, v1, p2, v2, distance):
+    """This calculates the earliest time at which two moving points come within the given
+    distance of each other, such as the centres of two circles and the sum of their radii.
+    It is 0 when they are already that close and approaching, and inf when they never will be
+
+    >>> time_of_impact((0, 0), (10, 0), (100, 0), (-10, 0), 20)
+    4.0
+    >>> time_of_impact((0, 0), (10, 0), (100, 30), (-10, 0), 50)
+    3.0
+    >>> time_of_impact((0, 0), (10, 0), (100, 30), (-10, 0), 20)
+    inf
+    >>> time_of_impact((0, 0), (-1, 0), (5, 0), (0, 0), 10)
+    inf
+    """
+    dp = numpy.subtract(p2, p1, dtype=float)
+    dv = numpy.subtract(v2, v1, dtype=float)
+    a = numpy.einsum('...i,...i->...', dv, dv)
+    b = 2 * numpy.einsum('...i,...i->...', dp, dv)
+    c = numpy.einsum('...i,...i->...', dp, dp) - distance**2
+    discriminant = b*b - 4*a*c
+    with numpy.errstate(divide='ignore', invalid='ignore'):
+        time = (-b - numpy.sqrt(numpy.maximum(discriminant, 0))) / (2*a)
+    time = numpy.where(c <= 0, 0.0, time)
+    time = numpy.where((b >= 0) | (discriminant < 0), numpy.inf, time)
+    return time.item() if time.ndim == 0 else time
+
 def pythagorean_c(a, b):
     """This is the pythagorean theorem solving for the hypotenuse
 
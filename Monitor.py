@@ -0,0 +1,88 @@
+#####################
+### M O N I T O R ###
+#####################
+
+
+# Contains the conservation monitor
+#
+# Every system is closed, so the total kinetic energy and the total momentum of a World should
+# never change. The monitor measures both over all bodies in one vectorized pass and reports how
+# far they have drifted from the totals it started with.
+
+
+import logging
+
+import numpy
+
+from Energy import *
+
+
+logger = logging.getLogger('Monitor')
+
+
+class ConservationError(Exception):
+    """Raised when the energy or momentum of a World drifts further than the tolerance"""
+
+
+class ConservationMonitor:
+    """Checks that a World keeps the kinetic energy and momentum it started with
+
+    Drift is relative. Energy drift is measured against the starting energy. Momentum drift is
+    the length of the change in total momentum measured against the starting sum of the
+    momentum of every body, so a system whose momentum adds up to zero can still drift. When a
+    drift passes the tolerance the monitor raises a ConservationError, or logs a warning when
+    action is 'log'.
+
+    >>> from World import World
+    >>> world = World()
+    >>> world.extend([[0, 0], [20, 0]], [[10, 10], [10, 10]], [1, 3], [1, 1], [True, True], vel=[[4, 0], [0, 0]])
+    range(0, 2)
+    >>> monitor = ConservationMonitor(world, tolerance=1e-9)
+    >>> world.vel[:] = [[-2, 0], [2, 0]]
+    >>> monitor.check()
+    (0.0, 0.0)
+    >>> world.vel[1, 0] = 3
+    >>> monitor.check()
+    Traceback (most recent call last):
+    ...
+    Monitor.ConservationError: energy drifted by 0.938 and momentum by 0.75
+    """
+
+    def __init__(self, world, every=100, tolerance=1e-6, action='raise'):
+        if action not in ('raise', 'log'):
+            raise ValueError('action must be raise or log, not ' + repr(action))
+        self.world = world
+        self.every = every
+        self.tolerance = tolerance
+        self.action = action
+        self.energy = Energy()
+        self.checks = 0
+        self.worst = (0.0, 0.0)
+        self.reset()
+
+    def totals(self):
+        """Returns the total kinetic energy and the total momentum along every axis"""
+        world = self.world
+        return self.energy.calc_total_kinetic(world.mass, world.vel), MomentumArray.calc_total(world.mass, world.vel)
+
+    def reset(self):
+        """Takes the current totals as the ones to compare against"""
+        world = self.world
+        self.initial_energy, self.initial_momentum = self.totals()
+        self.momentum_scale = float(numpy.dot(numpy.abs(world.mass), numpy.sqrt(numpy.einsum('ij,ij->i', world.vel, world.vel))))
+
+    def check(self):
+        """Measures the drift of energy and momentum since the start and returns both"""
+        energy, momentum = self.totals()
+        energy_drift = abs(energy - self.initial_energy) / self.initial_energy if self.initial_energy else abs(energy)
+        change = float(numpy.linalg.norm(momentum - self.initial_momentum))
+        momentum_drift = change / self.momentum_scale if self.momentum_scale else change
+        self.checks += 1
+        self.worst = max(self.worst[0], energy_drift), max(self.worst[1], momentum_drift)
+
+        if energy_drift > self.tolerance or momentum_drift > self.tolerance:
+            message = 'energy drifted by %.3g and momentum by %.3g' % (energy_drift, momentum_drift)
+            if self.action == 'raise':
+                raise ConservationError(message)
+            logger.warning(message)
+        return energy_drift, momentum_drift
@@ -0,0 +1,190 @@
+#######################
+### P R O F I L E R ###
+#######################
+
+
+# Contains the Profiler
+#
+# The Profiler times the phases of each step, counts what the Collision system does and keeps
+# a histogram of frame times. It is off unless enabled, and while off every hook is a single
+# attribute check, so it can stay in the step loop. The shared instance is profiler.
+
+
+import bisect, csv, json, time
+
+from Vector import *
+
+
+class _Phase:
+    """Context manager that adds the time spent inside it to a phase of a Profiler"""
+
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.profiler.add_time(self.name, time.perf_counter() - self.start)
+
+
+class _NoPhase:
+    """Context manager that does nothing, used while the Profiler is off"""
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc):
+        pass
+
+
+_no_phase = _NoPhase()
+
+
+class Profiler:
+    """Phase timers, counters and a frame time histogram
+
+    >>> profiler = Profiler()
+    >>> with profiler.phase('move'):
+    ...     pass
+    >>> profiler.count('passes')
+    >>> profiler.to_dict()['counters']
+    {}
+    >>> profiler.enable()
+    >>> with profiler.phase('move'):
+    ...     _ = Position(1, 2) + Position(1, 3)
+    >>> profiler.count('passes', 2)
+    >>> profiler.frame(0.005)
+    >>> profiler.disable()
+    >>> result = profiler.to_dict()
+    >>> result['phases']['move']['calls'], result['counters']
+    (1, {'vectors': 3, 'passes': 2})
+    """
+
+    # upper edges of the frame time histogram bins, in seconds
+    frame_bins = (0.001, 0.002, 0.004, 0.008, 0.016, 0.033, 0.066, 0.125, 0.25, float('inf'))
+
+    def __init__(self):
+        self.enabled = False
+        self._patched = {}
+        self.reset()
+
+    def reset(self):
+        """Forgets every measurement"""
+        self.phases = {}
+        self.counters = {}
+        self.histogram = [0] * len(self.frame_bins)
+        self.frames = 0
+        self.frame_total = 0.0
+
+    def enable(self):
+        """Starts measuring. Vector allocations are counted by wrapping the Vector
+        constructors only while enabled, so they cost nothing otherwise"""
+        if self.enabled:
+            return
+        self.enabled = True
+        self._patch_vectors()
+
+    def disable(self):
+        """Stops measuring and keeps what was measured"""
+        if not self.enabled:
+            return
+        self.enabled = False
+        for (owner, name), original in self._patched.items():
+            setattr(owner, name, original)
+        self._patched = {}
+
+    def toggle(self):
+        if self.enabled:
+            self.disable()
+        else:
+            self.enable()
+
+    def _patch_vectors(self):
+        count = self.count
+        init, new, create = Vector.__init__, Vector._new, Vector.create_vector
+
+        def counted_init(vector, direction, magnitude):
+            count('vectors')
+            init(vector, direction, magnitude)
+
+        def counted_new(vector, value):
+            count('vectors')
+            return new(vector, value)
+
+        def counted_create(vector_type, value):
+            count('vectors')
+            return create(vector_type, value)
+
+        self._patched = {(Vector, '__init__'): init, (Vector, '_new'): new, (Vector, 'create_vector'): Vector.__dict__['create_vector']}
+        Vector.__init__ = counted_init
+        Vector._new = counted_new
+        Vector.create_vector = staticmethod(counted_create)
+
+    def phase(self, name):
+        """Returns a context manager that times its block as the named phase"""
+        if not self.enabled:
+            return _no_phase
+        return _Phase(self, name)
+
+    def add_time(self, name, seconds):
+        """Adds seconds and one call to the named phase"""
+        if not self.enabled:
+            return
+        phase = self.phases.get(name)
+        if phase is None:
+            phase = self.phases[name] = [0.0, 0]
+        phase[0] += seconds
+        phase[1] += 1
+
+    def count(self, name, amount=1):
+        """Adds amount to the named counter"""
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def frame(self, seconds):
+        """Records the time one frame took"""
+        if self.enabled:
+            self.histogram[bisect.bisect_left(self.frame_bins, seconds)] += 1
+            self.frames += 1
+            self.frame_total += seconds
+
+    def to_dict(self):
+        return {
+            'phases': {name: {'seconds': seconds, 'calls': calls} for name, (seconds, calls) in self.phases.items()},
+            'counters': dict(self.counters),
+            'frames': {
+                'count': self.frames,
+                'mean_seconds': self.frame_total / self.frames if self.frames else None,
+                'histogram': [{'up_to_seconds': edge, 'frames': frames} for edge, frames in zip(self.frame_bins, self.histogram)],
+            },
+        }
+
+    def write_json(self, path):
+        with open(path, 'w') as file:
+            json.dump(self.to_dict(), file, indent=1)
+
+    def write_csv(self, path):
+        """Writes one row per measurement: kind, name, value and calls"""
+        with open(path, 'w', newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(['kind', 'name', 'value', 'calls'])
+            for name, (seconds, calls) in self.phases.items():
+                writer.writerow(['phase', name, seconds, calls])
+            for name, value in self.counters.items():
+                writer.writerow(['counter', name, value, ''])
+            for edge, frames in zip(self.frame_bins, self.histogram):
+                writer.writerow(['frame_histogram', edge, frames, ''])
+
+    def write(self, path):
+        """Writes CSV when the path ends in .csv and JSON otherwise"""
+        if path.endswith('.csv'):
+            self.write_csv(path)
+        else:
+            self.write_json(path)
+
+
+profiler = Profiler()
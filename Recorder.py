@@ -0,0 +1,164 @@
+#######################
+### R E C O R D E R ###
+#######################
+
+
+# Contains the trajectory recorder and its reader
+#
+# The recorder appends the positions and velocities of a World to a file every few steps.
+# The file grows a chunk of frames at a time and only the chunk being written is mapped, so
+# recording uses the same memory however long it runs. The reader maps the whole file and
+# can go straight to any recorded step:
+#
+#     python Simulation.py --scene gas --steps 10000 --record gas.trace --every 10
+
+
+import struct
+
+import numpy
+
+
+MAGIC = b'ORBTRACE'
+VERSION = 1
+HEADER = struct.Struct('<8sIIQQQ')
+HEADER_SIZE = 64
+
+# bytes of frames mapped at once when the chunk is not given in frames
+CHUNK_BYTES = 32 * 1024 * 1024
+
+
+class TrajectoryRecorder:
+    """Writes a frame of the pos and vel columns of a World every few calls of record
+
+    Frame k holds the World as it was on call k*every of record, so calling record once
+    before the first step and once after every step makes frame k the state after step
+    k*every. Each frame is copied straight from the World arrays into the mapped chunk. A
+    chunk is the given number of frames, or as many as fit in CHUNK_BYTES.
+
+    >>> import os, tempfile
+    >>> from World import World
+    >>> world = World()
+    >>> world.extend([[0, 0], [50, 0]], [[10, 10], [10, 10]], [1, 1], [1, 1], [True, True], vel=[[1, 0], [0, 2]])
+    range(0, 2)
+    >>> path = os.path.join(tempfile.mkdtemp(), 'world.trace')
+    >>> with TrajectoryRecorder(path, world, every=2, chunk=2) as recorder:
+    ...     for step in range(7):
+    ...         recorder.record()
+    ...         world.move()
+    >>> trajectory = Trajectory(path)
+    >>> len(trajectory), trajectory.steps.tolist()
+    (4, [0, 2, 4, 6])
+    >>> step, pos, vel = trajectory.seek(5)
+    >>> step, pos.tolist()
+    (4, [[4.0, 0.0], [50.0, 8.0]])
+    """
+
+    def __init__(self, path, world, every=1, chunk=None):
+        self.path = path
+        self.world = world
+        self.every = every
+        self.count = world.count
+        self.frame_shape = (2, world.count, world.axes)
+        self.frame_bytes = 8 * int(numpy.prod(self.frame_shape))
+        self.chunk = chunk or max(1, CHUNK_BYTES // max(self.frame_bytes, 1))
+        self.calls = 0
+        self.frames = 0
+        self.buffer = None
+        self.file = open(path, 'wb+')
+        self._write_header()
+
+    def _write_header(self):
+        self.file.seek(0)
+        self.file.write(HEADER.pack(MAGIC, VERSION, self.world.axes, self.count, self.every, self.frames).ljust(HEADER_SIZE, b'\0'))
+        self.file.flush()
+
+    def _map_chunk(self):
+        """Grows the file by a chunk of frames and maps only that chunk"""
+        if self.buffer is not None:
+            self.buffer.flush()
+            self._write_header()
+        self.file.truncate(HEADER_SIZE + (self.frames + self.chunk) * self.frame_bytes)
+        self.buffer = numpy.memmap(self.file, dtype=numpy.float64, mode='r+',
+                                   offset=HEADER_SIZE + self.frames * self.frame_bytes,
+                                   shape=(self.chunk,) + self.frame_shape)
+
+    def record(self):
+        """Records the World if this call is one of every"""
+        calls = self.calls
+        self.calls += 1
+        if calls % self.every:
+            return
+        if self.world.count != self.count:
+            raise ValueError('the World had %d bodies when recording started and has %d now' % (self.count, self.world.count))
+        index = self.frames % self.chunk
+        if index == 0:
+            self._map_chunk()
+        frame = self.buffer[index]
+        frame[0] = self.world.pos
+        frame[1] = self.world.vel
+        self.frames += 1
+
+    def close(self):
+        """Writes out the last frames and trims the file to them"""
+        if self.file.closed:
+            return
+        if self.buffer is not None:
+            self.buffer.flush()
+            self.buffer = None
+        self.file.truncate(HEADER_SIZE + self.frames * self.frame_bytes)
+        self._write_header()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Trajectory:
+    """Read only view of a recorded trajectory
+
+    pos and vel hold every frame as arrays of shape (frames, bodies, axes) mapped from the
+    file, so only the frames that are used are read.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as file:
+            magic, version, self.axes, self.count, self.every, self.frames = HEADER.unpack(file.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(path + ' is not a trajectory file')
+        if version != VERSION:
+            raise ValueError('unsupported trajectory file version ' + str(version))
+        shape = (self.frames, 2, self.count, self.axes)
+        if self.frames and self.count:
+            self.data = numpy.memmap(path, dtype=numpy.float64, mode='r', offset=HEADER_SIZE, shape=shape)
+        else:
+            self.data = numpy.zeros(shape)
+        self.pos = self.data[:, 0]
+        self.vel = self.data[:, 1]
+        self.steps = numpy.arange(self.frames) * self.every
+
+    def __len__(self):
+        return self.frames
+
+    def __getitem__(self, frame):
+        """Returns the pos and vel of a frame"""
+        return self.pos[frame], self.vel[frame]
+
+    def seek(self, step):
+        """Returns the last recorded step at or before the given step with its pos and vel"""
+        if step < 0 or not self.frames:
+            raise IndexError('step %d was not recorded' % step)
+        frame = min(step // self.every, self.frames - 1)
+        return int(self.steps[frame]), self.pos[frame], self.vel[frame]
+
+    def restore(self, world, step):
+        """Puts the World back in the state of the last recorded step at or before step and
+        returns that step, so a run can carry on from there"""
+        recorded, pos, vel = self.seek(step)
+        world.pos[:] = pos
+        world.previous[:] = pos
+        world.vel[:] = vel
+        return recorded
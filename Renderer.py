@@ -0,0 +1,83 @@
+#######################
+### R E N D E R E R ###
+#######################
+
+
+# Contains the Renderer
+#
+# Rather than filling and flipping the whole window every frame, the renderer only clears the
+# areas that moving entities have left, redraws what is inside them, and updates those areas
+# of the display.
+
+
+import pygame
+
+
+class DirtyRenderer:
+    """Draws entities by updating only the parts of the surface that changed
+
+    Entities that cannot move are drawn on the first frame and afterwards only when a moving
+    entity uncovers them.
+
+    >>> from World import World
+    >>> from Entity import Orb, MovingOrb
+    >>> surface, world = pygame.Surface((100, 100)), World()
+    >>> still, moving = Orb([0, 0], [10, 10], (255, 0, 0), surface, 1, 1, world), MovingOrb([50, 0], [10, 10], (0, 255, 0), surface, 1, 1, world)
+    >>> renderer = DirtyRenderer(surface, update=lambda rects: None)
+    >>> len(renderer.draw([still, moving]))
+    1
+    >>> renderer.draw([still, moving])
+    []
+    >>> moving.vel[0].direction, moving.vel[0].magnitude = 1, 5
+    >>> moving.move()
+    >>> renderer.draw([still, moving])
+    [<rect(50, 0, 10, 10)>, <rect(55, 0, 10, 10)>]
+    """
+
+    def __init__(self, surface, background=(0, 0, 0), update=None):
+        self.surface = surface
+        self.background = background
+        self.update = pygame.display.update if update is None else update
+        self.rects = {}
+        self.full = True
+
+    def invalidate(self):
+        """Makes the next frame redraw and update the whole surface"""
+        self.full = True
+
+    def draw(self, entities, alpha=1):
+        """Draws one frame and returns the rects of the surface that were updated"""
+        if self.full:
+            self.surface.fill(self.background)
+            for entity in entities:
+                entity.draw(alpha=alpha)
+                self.rects[entity] = entity.rect.copy()
+            self.full = False
+            dirty = [self.surface.get_rect()]
+            self.update(dirty)
+            return dirty
+
+        dirty, redraw = [], set()
+        for entity in entities:
+            if not entity.movable:
+                continue
+            old = self.rects.get(entity)
+            if old is None or entity.draw_rect(alpha) != old:
+                redraw.add(entity)
+                if old is not None:
+                    self.surface.fill(self.background, old)
+                    dirty.append(old)
+
+        for entity in entities:
+            if entity not in redraw and entity in self.rects and self.rects[entity].collidelist(dirty) != -1:
+                redraw.add(entity)
+
+        for entity in entities:
+            if entity in redraw:
+                entity.draw(alpha=alpha)
+                self.rects[entity] = entity.rect.copy()
+                dirty.append(self.rects[entity])
+
+        if dirty:
+            self.update(dirty)
+        return dirty
@@ -0,0 +1,151 @@
+#################
+### S C E N E ###
+#################
+
+
+# Contains the scenes
+#
+# A scene is a function that takes a surface and a World and returns the entities it created
+# in that World. The surface can be None when the scene is never drawn.
+
+
+import random
+
+from Entity import *
+
+
+def default_scene(surface=None, world=None):
+    """The row of orbs struck by Orb1 between the heavy Orb0 and Orb4
+
+    >>> world = World()
+    >>> len(default_scene(None, world)), len(world)
+    (9, 9)
+    """
+    return [
+        # Character([1,1], [100,100], [100,100,100], surface, 100, 100000000, world),
+        Orb0([0, 250], [40, 40], [0, 255, 0], surface, 1000000000, 100000000, world),
+        Orb1([41, 250], [40, 40], [0, 0, 255], surface, 1, 100000000, world),
+        Orb3([200, 250], [40, 40], [255, 0, 0], surface, 1, 100000000, world),
+        Orb2([241, 250], [40, 40], [255, 0, 0], surface, 1, 100000000, world),
+        Orb2([282, 250], [40, 40], [255, 0, 0], surface, 1, 100000000, world),
+        Orb2([323, 250], [40, 40], [255, 0, 0], surface, 1, 100000000, world),
+        Orb2([364, 250], [40, 40], [255, 0, 0], surface, 1, 100000000, world),
+        # Orb2([405, 250], [40, 40], [255, 0, 0], surface, 1, 100000000, world),
+        # Orb2([446, 250], [40, 40], [255, 0, 0], surface, 1, 100000000, world),
+        Orb2([487, 250], [40, 40], [0, 255, 255], surface, 1, 100000000, world),
+        Orb4([600, 250], [40, 40], [255, 0, 255], surface, 100000000000, 100000000, world),
+    ]
+
+
+def simulator_scene(heavy_mass=1000000000, striker_mass=1, striker_speed=10, orb_mass=1, wall_mass=100000000000,
+                    spacing=1, tensile_strength=100000000):
+    """Returns the default scene with its masses, striker speed and the gap between the orbs
+    of its row as parameters. The defaults give the default scene
+
+    >>> world = World()
+    >>> _ = simulator_scene(spacing=4)(None, world)
+    >>> world.pos[:7, 0].tolist(), world.vel[1, 0]
+    ([0.0, 44.0, 200.0, 244.0, 288.0, 332.0, 376.0], np.float64(10.0))
+    """
+    def scene(surface=None, world=None):
+        heavy = Orb0([0, 250], [40, 40], [0, 255, 0], surface, heavy_mass, tensile_strength, world)
+        striker = Orb1([40 + spacing, 250], [40, 40], [0, 0, 255], surface, striker_mass, tensile_strength, world)
+        striker.vel[0].value = striker_speed
+        row = [Orb2([200 + index*(40 + spacing), 250], [40, 40], [255, 0, 0], surface, orb_mass, tensile_strength, world)
+               for index in range(5)]
+        last = Orb2([487, 250], [40, 40], [0, 255, 255], surface, orb_mass, tensile_strength, world)
+        wall = Orb4([600, 250], [40, 40], [255, 0, 255], surface, wall_mass, tensile_strength, world)
+        return [heavy, striker] + row + [last, wall]
+    return scene
+
+
+def cradle_scene(length, speed=10, size=40, gap=1):
+    """Returns a scene of a striker hitting a row of length resting orbs, like Newton's cradle
+
+    >>> world = World()
+    >>> len(cradle_scene(8)(None, world)), world.vel[:, 0].tolist()[:2]
+    (9, [10.0, 0.0])
+    """
+    def scene(surface=None, world=None):
+        striker = Collidable([0, 250], [size, size], [0, 0, 255], surface, 1, 100000000, world)
+        striker.vel[0].direction, striker.vel[0].magnitude = 1, speed
+        start = 2 * size
+        return [striker] + [Collidable([start + index*(size + gap), 250], [size, size], [255, 0, 0], surface, 1, 100000000, world)
+                            for index in range(length)]
+    return scene
+
+
+def gas_scene(count, speed=5, size=10, spacing=30, seed=0):
+    """Returns a scene of count orbs with random masses and velocities along a line
+
+    >>> world = World()
+    >>> len(gas_scene(50)(None, world)), bool((abs(world.vel[:, 0]) <= 5).all())
+    (50, True)
+    """
+    def scene(surface=None, world=None):
+        rng = random.Random(seed)
+        entities = []
+        for index in range(count):
+            orb = Collidable([index*spacing + rng.uniform(0, spacing - size - 1), 250], [size, size], [255, 255, 255],
+                             surface, rng.uniform(1, 10), 100000000, world)
+            orb.vel[0].value = rng.uniform(-speed, speed)
+            entities.append(orb)
+        return entities
+    return scene
+
+
+def mass_ratio_scene(ratio, count=6, speed=10, size=40):
+    """Returns the default scene with its heavy orbs ratio and 100*ratio times the light ones
+
+    >>> world = World()
+    >>> _ = mass_ratio_scene(1000)(None, world)
+    >>> world.mass[[0, -1]].tolist()
+    [1000.0, 100000.0]
+    """
+    def scene(surface=None, world=None):
+        heavy = Orb0([0, 250], [size, size], [0, 255, 0], surface, ratio, 100000000, world)
+        striker = Orb1([size + 1, 250], [size, size], [0, 0, 255], surface, 1, 100000000, world)
+        striker.vel[0].direction, striker.vel[0].magnitude = 1, speed
+        row = [Orb2([5*size + index*(size + 1), 250], [size, size], [255, 0, 0], surface, 1, 100000000, world)
+               for index in range(count)]
+        wall = Orb4([5*size + count*(size + 1) + 3*size, 250], [size, size], [255, 0, 255], surface, 100*ratio, 100000000, world)
+        return [heavy, striker] + row + [wall]
+    return scene
+
+
+def field_scene(count, speed=5, size=10, spacing=30, seed=0):
+    """Returns a scene of count orbs on a square grid moving in random directions in 2D
+
+    >>> world = World()
+    >>> len(field_scene(50)(None, world)), bool((world.vel[:, 1] != 0).all())
+    (50, True)
+    """
+    def scene(surface=None, world=None):
+        rng = random.Random(seed)
+        side = max(1, round(count ** 0.5))
+        entities = []
+        for index in range(count):
+            column, row = index % side, index // side
+            orb = Collidable([column*spacing + rng.uniform(0, spacing - size - 1), row*spacing + rng.uniform(0, spacing - size - 1)],
+                             [size, size], [255, 255, 255], surface, rng.uniform(1, 10), 100000000, world)
+            angle = rng.uniform(0, 2*math.pi)
+            orb.vel[0].value, orb.vel[1].value = speed*math.cos(angle), speed*math.sin(angle)
+            entities.append(orb)
+        return entities
+    return scene
+
+
+scenes = {
+    'default': default_scene,
+    'cradle': cradle_scene(8),
+    'gas': gas_scene(100),
+    'mass_ratio': mass_ratio_scene(1000000000),
+    'field': field_scene(100),
+}
+
+generators = {
+    'cradle': cradle_scene,
+    'gas': gas_scene,
+    'mass_ratio': lambda size: mass_ratio_scene(1000000000, count=size),
+    'field': field_scene,
+}
@@ -0,0 +1,176 @@
+###########################
+### S C E N E   F I L E ###
+###########################
+
+
+# Contains the binary scene format
+#
+# A scene file is a fixed header followed by one typed column after another: pos, vel, dim,
+# mass, tensile_strength, color and kind. Each column is read with numpy.memmap and copied
+# into a World in bulk, and the entities of the bodies are only created when they are first
+# asked for, so large scenes load without running a constructor per body:
+#
+#     python SceneFile.py gas --size 100000 --output gas.scene
+#     python Simulation.py --scene-file gas.scene --engine chains
+
+
+import argparse, struct
+
+import numpy
+
+from Scene import *
+
+
+MAGIC = b'ORBSCENE'
+VERSION = 1
+HEADER = struct.Struct('<8sIIQ')
+HEADER_SIZE = 64
+
+# the entity classes a body can be loaded as, by their index in the kind column
+kinds = (Box, Orb, MovingOrb, Collidable)
+
+
+def _layout(count, axes):
+    """Returns the name, dtype, shape and byte offset of every column"""
+    columns = (
+        ('pos', numpy.float64, (count, axes)),
+        ('vel', numpy.float64, (count, axes)),
+        ('dim', numpy.float64, (count, axes)),
+        ('mass', numpy.float64, (count,)),
+        ('tensile_strength', numpy.float64, (count,)),
+        ('color', numpy.uint8, (count, 3)),
+        ('kind', numpy.uint8, (count,)),
+    )
+    offset, layout = HEADER_SIZE, []
+    for name, dtype, shape in columns:
+        layout.append((name, dtype, shape, offset))
+        offset += numpy.dtype(dtype).itemsize * int(numpy.prod(shape))
+    return layout
+
+
+def kind_of(entity):
+    """Returns the index in kinds of the most specific class the entity is an instance of"""
+    for kind in reversed(range(len(kinds))):
+        if isinstance(entity, kinds[kind]):
+            return kind
+    raise TypeError('cannot store ' + type(entity).__name__ + ' in a scene file')
+
+
+def write_scene(path, world):
+    """Writes every body of the World to a scene file. A body without an entity is stored as
+    a white MovingOrb when it is movable and as an Orb otherwise"""
+    count, axes = world.count, world.axes
+    colors = numpy.full((count, 3), 255, dtype=numpy.uint8)
+    kind = numpy.where(world.movable, kinds.index(MovingOrb), kinds.index(Orb)).astype(numpy.uint8)
+    for row, entity in enumerate(world.entities):
+        if entity is not None:
+            colors[row] = entity.color[:3]
+            kind[row] = kind_of(entity)
+
+    columns = {'pos': world.pos, 'vel': world.vel, 'dim': world.dim, 'mass': world.mass,
+               'tensile_strength': world.tensile_strength, 'color': colors, 'kind': kind}
+    with open(path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, VERSION, axes, count).ljust(HEADER_SIZE, b'\0'))
+        for name, dtype, shape, offset in _layout(count, axes):
+            numpy.ascontiguousarray(columns[name], dtype=dtype).tofile(file)
+
+
+class SceneFile:
+    """Read only view of the columns of a scene file
+
+    >>> import os, tempfile
+    >>> world = World()
+    >>> _ = gas_scene(20)(None, world)
+    >>> path = os.path.join(tempfile.mkdtemp(), 'gas.scene')
+    >>> write_scene(path, world)
+    >>> scene = SceneFile(path)
+    >>> len(scene), scene.axes
+    (20, 2)
+    >>> loaded = World()
+    >>> entities = scene.load(loaded)
+    >>> bool((loaded.vel == world.vel).all()), loaded.entities.count(None)
+    (True, 20)
+    >>> type(entities[3]).__name__, entities[3].pos[0].value == float(world.pos[3, 0]), loaded.entities.count(None)
+    ('Collidable', True, 19)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as file:
+            magic, version, self.axes, self.count = HEADER.unpack(file.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(path + ' is not a scene file')
+        if version != VERSION:
+            raise ValueError('unsupported scene file version ' + str(version))
+        for name, dtype, shape, offset in _layout(self.count, self.axes):
+            if self.count:
+                column = numpy.memmap(path, dtype=dtype, mode='r', offset=offset, shape=shape)
+            else:
+                column = numpy.zeros(shape, dtype=dtype)
+            setattr(self, name, column)
+
+    def __len__(self):
+        return self.count
+
+    def load(self, world=None, surface=None):
+        """Copies every body into the World and returns their entities, which are only created
+        when they are first used"""
+        world = Entity.world if world is None else world
+        if world.axes != self.axes:
+            raise ValueError('the scene has %d axes but the World has %d' % (self.axes, world.axes))
+        movable = numpy.array([kind.movable for kind in kinds])[self.kind]
+        rows = world.extend(self.pos, self.dim, self.mass, self.tensile_strength, movable, vel=self.vel)
+        return LazyEntities(self, world, rows, surface)
+
+
+class LazyEntities:
+    """Sequence of the entities of loaded bodies that creates each one on first access"""
+
+    def __init__(self, scene, world, rows, surface=None):
+        self.scene = scene
+        self.world = world
+        self.rows = rows
+        self.surface = surface
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        row = self.rows[index]
+        entity = self.world.entities[row]
+        if entity is None:
+            index = row - self.rows.start
+            kind = kinds[self.scene.kind[index]]
+            entity = kind.from_row(self.world, row, self.scene.color[index].tolist(), self.surface)
+        return entity
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+
+def file_scene(path):
+    """Returns a scene that loads the given scene file"""
+    def scene(surface=None, world=None):
+        return SceneFile(path).load(world, surface)
+    return scene
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Writes a scene to a scene file')
+    parser.add_argument('scene', choices=sorted(set(scenes) | set(generators)))
+    parser.add_argument('--size', type=int, help='size given to the scene generator')
+    parser.add_argument('--output', required=True)
+    args = parser.parse_args(args)
+
+    world = World()
+    scene = generators[args.scene](args.size) if args.size is not None else scenes[args.scene]
+    scene(None, world)
+    write_scene(args.output, world)
+    print('wrote %d bodies to %s' % (world.count, args.output))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+#########################
+### S C H E D U L E R ###
+#########################
+
+
+# Contains the event driven Collision system
+#
+# Instead of looking for overlaps once the bodies have moved, the scheduler predicts when each
+# pair of neighbouring bodies will touch and jumps straight from one impact to the next. Only
+# the pairs next to a collision are predicted again, and every impact happens at its exact time
+# rather than at the end of a frame.
+
+
+import heapq, numpy
+
+from Math import *
+
+
+class EventScheduler:
+    """Priority queue of the predicted impacts between neighbouring bodies of a World
+
+    Bodies are ordered along x once; in one dimension they cannot pass each other, so only
+    neighbours in that order can collide. The bodies must therefore all lie and move along x,
+    or they would pass through each other across it. The position of a body in the World is
+    only brought up to date when it collides or when advance finishes.
+
+    >>> from World import World
+    >>> world = World()
+    >>> world.add(None, [0, 0], [10, 10], 1, 1, movable=True), world.add(None, [100, 0], [10, 10], 1, 1, movable=True)
+    (0, 1)
+    >>> world.vel[:, 0] = 10, -10
+    >>> scheduler = EventScheduler(world)
+    >>> scheduler.advance(10)
+    1
+    >>> world.pos[:, 0].tolist(), world.vel[:, 0].tolist()
+    ([-10.0, 110.0], [-10.0, 10.0])
+    >>> world.vel[0, 1] = 1
+    >>> EventScheduler(world)
+    Traceback (most recent call last):
+    ...
+    ValueError: the EventScheduler only predicts impacts along x, but the bodies do not all lie and move along x
+    """
+
+    def __init__(self, world, rows=None):
+        self.world = world
+        self.rows = numpy.flatnonzero(world.movable) if rows is None else numpy.asarray(rows)
+        if not world.along_x(self.rows):
+            raise ValueError('the EventScheduler only predicts impacts along x, but the bodies do not all lie and move along x')
+        self.time = 0.0
+        self.collisions = 0
+        self.reset()
+
+    def reset(self):
+        """Orders the bodies along x and predicts every neighbouring impact"""
+        world = self.world
+        self.order = self.rows[numpy.argsort(world.pos[self.rows, 0], kind='stable')]
+        self.stamp = numpy.full(world.count, self.time)
+        self.counts = numpy.zeros(world.count, dtype=int)
+        self.heap = []
+        for index in range(len(self.order) - 1):
+            self._predict(index)
+
+    def snapshot(self):
+        """Returns a copy of everything the scheduler has predicted"""
+        return self.time, self.collisions, self.order.copy(), self.stamp.copy(), self.counts.copy(), list(self.heap)
+
+    def restore(self, snapshot):
+        """Puts the predictions back as they were when the snapshot was taken"""
+        time, self.collisions, order, stamp, counts, heap = snapshot
+        self.time = time
+        self.order, self.stamp, self.counts, self.heap = order.copy(), stamp.copy(), counts.copy(), list(heap)
+
+    def _position(self, row):
+        return self.world._pos[row, 0] + self.world._vel[row, 0] * (self.time - self.stamp[row])
+
+    def _sync(self, row):
+        self.world._pos[row, 0] = self._position(row)
+        self.stamp[row] = self.time
+
+    def _predict(self, index):
+        """Pushes the impact of the pair at index and index + 1 in the order, if there is one"""
+        if index < 0 or index >= len(self.order) - 1:
+            return
+        world = self.world
+        left, right = self.order[index], self.order[index + 1]
+        v1, v2 = world._vel[right, 0], world._vel[left, 0]
+        if v2 <= v1:
+            return
+        p1 = self._position(right)
+        p2 = self._position(left) + world._dim[left, 0]
+        time = max(time_of_collision(p1, v1, p2, v2), 0)
+        heapq.heappush(self.heap, (self.time + time, index, self.counts[left], self.counts[right]))
+
+    def next_event(self):
+        """Returns the time of the next valid impact, or None if nothing will collide"""
+        heap = self.heap
+        while heap:
+            time, index, left_count, right_count = heap[0]
+            left, right = self.order[index], self.order[index + 1]
+            if self.counts[left] == left_count and self.counts[right] == right_count:
+                return time
+            heapq.heappop(heap)
+        return None
+
+    def advance(self, time=1):
+        """Resolves every impact in the next interval of time and moves the World to its end.
+        Returns the number of impacts that were resolved"""
+        world = self.world
+        end = self.time + time
+        events = 0
+        while True:
+            event_time = self.next_event()
+            if event_time is None or event_time > end:
+                break
+            _, index, _, _ = heapq.heappop(self.heap)
+            left, right = self.order[index], self.order[index + 1]
+
+            self.time = event_time
+            self._sync(left)
+            self._sync(right)
+            v1f, v2f = collision_velocity(world._mass[left], world._vel[left, 0], world._mass[right], world._vel[right, 0])
+            world._vel[left, 0], world._vel[right, 0] = v1f, v2f
+            self.counts[left] += 1
+            self.counts[right] += 1
+
+            for neighbour in (index - 1, index, index + 1):
+                self._predict(neighbour)
+            events += 1
+
+        self.time = end
+        rows = self.rows
+        world._pos[rows, 0] += world._vel[rows, 0] * (end - self.stamp[rows])
+        self.stamp[rows] = end
+        self.collisions += events
+        return events
@@ -0,0 +1,334 @@
+###################
+### S E R V E R ###
+###################
+
+
+# Contains the local simulation server and its client
+#
+# The server runs a headless Simulation for other local processes, such as visualizers and
+# test harnesses, over TCP or a Unix socket:
+#
+#     python Server.py --port 8765
+#     python Server.py --unix /tmp/collision.sock
+#
+# A client sends one JSON command per line and the server answers each with a reply message.
+# The commands are
+#     {"command": "load", "scene": "gas", "engine": "overlap", ...}   builds a Simulation
+#     {"command": "step", "steps": 10}                                steps and sends a frame
+#     {"command": "run", "steps": 1000, "every": 10}                  steps in the background
+#     {"command": "pause"}                                            stops a run
+#     {"command": "status"}                                           reports the counters
+#
+# Every message starts with its kind and length. A frame is the step, the number of bodies
+# and axes, and then the pos and vel columns as float64. Each client has room for a single
+# frame waiting to be sent, so a client that reads slowly gets the newest frame and misses
+# the ones in between, and the physics never waits for it.
+
+
+import argparse, asyncio, json, struct
+
+import numpy
+
+from Simulation import *
+
+
+REPLY, FRAME = 0, 1
+MESSAGE = struct.Struct('<BI')
+FRAME_HEADER = struct.Struct('<QII')
+
+# Simulation arguments a load command may set
+load_options = ('engine', 'broadphase', 'dt', 'contact_cache', 'sleep_after', 'substeps')
+
+
+def message(kind, payload):
+    return MESSAGE.pack(kind, len(payload)) + payload
+
+
+def pack_frame(step, world):
+    """Returns the step and the pos and vel of every body of the World as a frame
+
+    >>> world = World()
+    >>> world.extend([[1, 2]], [[10, 10]], [1], [1], [True], vel=[[3, 4]])
+    range(0, 1)
+    >>> step, pos, vel = unpack_frame(pack_frame(7, world))
+    >>> step, pos.tolist(), vel.tolist()
+    (7, [[1.0, 2.0]], [[3.0, 4.0]])
+    """
+    return FRAME_HEADER.pack(step, world.count, world.axes) + world.pos.tobytes() + world.vel.tobytes()
+
+
+def unpack_frame(payload):
+    """Returns the step, pos and vel of a frame"""
+    step, count, axes = FRAME_HEADER.unpack_from(payload)
+    columns = numpy.frombuffer(payload, dtype=numpy.float64, offset=FRAME_HEADER.size).reshape(2, count, axes)
+    return step, columns[0], columns[1]
+
+
+class Subscriber:
+    """The frames waiting to be sent to one client
+
+    Only the newest frame is kept; offering another before it was sent drops the older one.
+
+    >>> subscriber = Subscriber(None)
+    >>> subscriber.offer(b'first'), subscriber.offer(b'second')
+    (None, None)
+    >>> subscriber.frame, subscriber.dropped
+    (b'second', 1)
+    """
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.frame = None
+        self.ready = asyncio.Event()
+        self.sent = 0
+        self.dropped = 0
+
+    def offer(self, frame):
+        if self.frame is not None:
+            self.dropped += 1
+        self.frame = frame
+        self.ready.set()
+
+    async def pump(self):
+        """Sends frames as fast as the client takes them"""
+        while True:
+            await self.ready.wait()
+            self.ready.clear()
+            frame, self.frame = self.frame, None
+            self.writer.write(message(FRAME, frame))
+            await self.writer.drain()
+            self.sent += 1
+
+
+class SimulationServer:
+    """Runs one Simulation and streams its frames to every connected client
+
+    >>> async def session():
+    ...     server = SimulationServer()
+    ...     listener = await server.serve(port=0)
+    ...     client = await SimulationClient.connect(port=listener.sockets[0].getsockname()[1])
+    ...     loaded = await client.command('load', scene='gas', broadphase='grid')
+    ...     stepped = await client.command('step', steps=10)
+    ...     step, pos, vel = await client.frame()
+    ...     await client.command('run', steps=50, every=5)
+    ...     while step < 60:
+    ...         step, pos, vel = await client.frame()
+    ...     status = await client.command('status')
+    ...     error = await client.command('load', scene='nowhere')
+    ...     missing = await client.command('load', scene_file='/nowhere.scene')
+    ...     client.writer.write(b'[1, 2]\\n')
+    ...     listed = await client.replies.get()
+    ...     alive = await client.command('status')
+    ...     await client.close()
+    ...     listener.close()
+    ...     await listener.wait_closed()
+    ...     print(loaded['count'], stepped['step'], pos.shape, status['step'], status['running'], error['error'])
+    ...     print(missing['ok'], 'No such file' in missing['error'], listed['error'], alive['step'])
+    >>> asyncio.run(session())
+    100 10 (100, 2) 60 False unknown scene 'nowhere'
+    False True a request must be a JSON object 60
+    """
+
+    def __init__(self):
+        self.simulation = None
+        self.subscribers = set()
+        self.runner = None
+
+    async def serve(self, host='127.0.0.1', port=8765, path=None):
+        """Starts listening on a TCP port, or on a Unix socket when a path is given"""
+        if path is not None:
+            return await asyncio.start_unix_server(self.handle, path)
+        return await asyncio.start_server(self.handle, host, port)
+
+    async def handle(self, reader, writer):
+        """Answers the commands of one client while streaming frames to it"""
+        subscriber = Subscriber(writer)
+        self.subscribers.add(subscriber)
+        pump = asyncio.ensure_future(subscriber.pump())
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    reply = await self.dispatch(json.loads(line))
+                except Exception as error:
+                    reply = {'ok': False, 'error': error.args[0] if len(error.args) == 1 else str(error) or type(error).__name__}
+                writer.write(message(REPLY, json.dumps(reply).encode()))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            self.subscribers.discard(subscriber)
+            pump.cancel()
+            writer.close()
+
+    async def dispatch(self, request):
+        """Carries out one command and returns its reply"""
+        if not isinstance(request, dict):
+            raise ValueError('a request must be a JSON object')
+        command = request.pop('command')
+        if command == 'load':
+            return self.load(**request)
+        if command == 'status':
+            return self.status()
+        if command == 'pause':
+            self.pause()
+            return self.status()
+        if self.simulation is None:
+            raise ValueError('no scene is loaded')
+        if self.running:
+            raise ValueError('the simulation is running')
+        if command == 'step':
+            steps = request.get('steps', 1)
+            self.runner = asyncio.ensure_future(self.run(steps, None))
+            await asyncio.wait([self.runner])
+            self.publish()
+            return self.status()
+        if command == 'run':
+            self.runner = asyncio.ensure_future(self.run(request.get('steps'), request.get('every', 1)))
+            return self.status()
+        raise ValueError('unknown command ' + repr(command))
+
+    def load(self, scene='default', scene_file=None, **options):
+        unknown = set(options) - set(load_options)
+        if unknown:
+            raise ValueError('unknown options ' + ', '.join(sorted(unknown)))
+        if scene_file is None and scene not in scenes:
+            raise ValueError('unknown scene ' + repr(scene))
+        self.pause()
+        self.simulation = Simulation(file_scene(scene_file) if scene_file else scenes[scene], **options)
+        self.publish()
+        return self.status()
+
+    @property
+    def running(self):
+        return self.runner is not None and not self.runner.done()
+
+    def status(self):
+        simulation = self.simulation
+        if simulation is None:
+            return {'ok': True, 'loaded': False}
+        return {'ok': True, 'loaded': True, 'count': simulation.world.count, 'axes': simulation.world.axes,
+                'step': simulation.steps, 'passes': simulation.passes, 'resolved': simulation.resolved,
+                'running': self.running, 'dropped': sum(subscriber.dropped for subscriber in self.subscribers)}
+
+    def pause(self):
+        if self.running:
+            self.runner.cancel()
+        self.runner = None
+
+    async def run(self, steps=None, every=1):
+        """Steps until steps have been taken, or until paused, sending a frame every few steps
+        when every is given and letting the clients in between steps"""
+        taken = 0
+        while steps is None or taken < steps:
+            self.simulation.step()
+            taken += 1
+            if every and taken % every == 0:
+                self.publish()
+            await asyncio.sleep(0)
+        if every and taken % every:
+            self.publish()
+
+    def publish(self):
+        """Offers the current frame to every client"""
+        frame = pack_frame(self.simulation.steps, self.simulation.world)
+        for subscriber in self.subscribers:
+            subscriber.offer(frame)
+
+
+class SimulationClient:
+    """A client of a SimulationServer that keeps the frames it receives in a queue
+
+    Once the server closes the connection, waiting for a reply or a frame raises
+    ConnectionError.
+
+    >>> async def closed():
+    ...     listener = await asyncio.start_server(lambda reader, writer: writer.close(), '127.0.0.1', 0)
+    ...     client = await SimulationClient.connect(port=listener.sockets[0].getsockname()[1])
+    ...     try:
+    ...         await client.command('status')
+    ...     except ConnectionError as error:
+    ...         print(error)
+    ...     await client.close()
+    ...     listener.close()
+    ...     await listener.wait_closed()
+    >>> asyncio.run(closed())
+    the server closed the connection
+    """
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.replies = asyncio.Queue()
+        self.frames = asyncio.Queue()
+        self.listener = asyncio.ensure_future(self.listen())
+
+    @classmethod
+    async def connect(cls, host='127.0.0.1', port=8765, path=None):
+        if path is not None:
+            return cls(*await asyncio.open_unix_connection(path))
+        return cls(*await asyncio.open_connection(host, port))
+
+    async def listen(self):
+        """Queues the replies and frames until the connection ends, then queues None on both
+        to wake anything waiting for them"""
+        try:
+            while True:
+                try:
+                    kind, length = MESSAGE.unpack(await self.reader.readexactly(MESSAGE.size))
+                    payload = await self.reader.readexactly(length)
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    return
+                if kind == REPLY:
+                    await self.replies.put(json.loads(payload))
+                else:
+                    await self.frames.put(unpack_frame(payload))
+        finally:
+            self.replies.put_nowait(None)
+            self.frames.put_nowait(None)
+
+    @staticmethod
+    async def _next(queue):
+        """Returns the next item of a queue, raising ConnectionError once the connection ended"""
+        item = await queue.get()
+        if item is None:
+            queue.put_nowait(None)
+            raise ConnectionError('the server closed the connection')
+        return item
+
+    async def command(self, command, **arguments):
+        """Sends a command and returns its reply"""
+        arguments['command'] = command
+        self.writer.write(json.dumps(arguments).encode() + b'\n')
+        await self.writer.drain()
+        return await self._next(self.replies)
+
+    async def frame(self):
+        """Returns the next frame as its step, pos and vel"""
+        return await self._next(self.frames)
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+        self.listener.cancel()
+
+
+async def serve_forever(host, port, path):
+    listener = await SimulationServer().serve(host, port, path)
+    async with listener:
+        await listener.serve_forever()
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Serves a headless simulation to local clients')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', help='Unix socket path to listen on instead of TCP')
+    args = parser.parse_args(args)
+    asyncio.run(serve_forever(args.host, args.port, args.unix))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,446 @@
+###########################
+### S I M U L A T I O N ###
+###########################
+
+
+# Contains the headless Simulation
+#
+# A Simulation builds a scene in its own World and steps it at a fixed time step as fast as
+# the CPU allows. It never touches the display or the event queue, so it can run on servers
+# without a display:
+#
+#     python Simulation.py --steps 10000 --engine chains
+#
+# With --profile the time of each phase and the collision counters are written to a JSON
+# file, or to CSV when the file name ends in .csv.
+
+
+import argparse, time
+
+import numpy
+
+from Entity import *
+from Collision import *
+from Islands import *
+from Broadphase import *
+from Scheduler import *
+from Scene import *
+from SceneFile import *
+from Recorder import *
+from Checkpoint import *
+from Monitor import *
+from Profiler import profiler
+
+
+broadphases = {
+    'sap': SweepAndPrune,
+    'grid': SpatialHash,
+}
+
+
+class Simulation:
+    """A scene and the Collision system that steps it
+
+    The engine is one of
+        overlap  the CollisionBox overlap passes of collision, optionally with a broadphase
+        islands  the same passes run on each contact island of resolve_islands
+        chains   the batched contact chain resolution of resolve_chains, at most max_sweeps
+                 sweeps a step
+        events   the predicted impacts of an EventScheduler
+
+    Only overlap and islands resolve collisions in two dimensions; chains and events work
+    along x, and both refuse a scene whose bodies do not all lie and move along x. The
+    broadphase is a name from broadphases or a broadphase object. With sleep_after, the
+    overlap and islands engines put a body to sleep once it has gone that many steps without
+    velocity: its CollisionBox is no longer stretched or scanned until a moving box hits it.
+    A ContactCache, with contact_cache, and a CollisionBudget only work with the overlap
+    engine; the budget bounds its passes in each step, or in each substep when there are
+    substeps. With substeps, a power of two, the overlap and islands engines take each step
+    in up to that many substeps, see multirate. Those two engines stretch the CollisionBoxes
+    over dt, but resolve the impacts of a step one pair at a time; a body that crosses more
+    than its own size in a step needs substeps to never pass through a crowd. chains and
+    events use no CollisionBoxes and refuse a broadphase, sleep_after and substeps.
+
+    >>> simulation = Simulation(engine='chains')
+    >>> simulation.run(20) > 0
+    True
+    >>> simulation.steps, [round(x) for x in simulation.world.pos[:3, 0]]
+    (20, [0, 151, 200])
+    >>> Simulation(engine='islands', contact_cache=True)
+    Traceback (most recent call last):
+    ...
+    ValueError: a contact cache needs the overlap engine
+    >>> Simulation(engine='events', substeps=4)
+    Traceback (most recent call last):
+    ...
+    ValueError: substeps needs the overlap or islands engine
+    >>> Simulation(scenes['field'], engine='chains')
+    Traceback (most recent call last):
+    ...
+    ValueError: the chains engine only resolves collisions along x, but the bodies do not all lie and move along x
+    """
+
+    engines = ('overlap', 'islands', 'chains', 'events')
+
+    def __init__(self, scene=default_scene, engine='overlap', broadphase=None, dt=1, surface=None, contact_cache=False, sleep_after=None, budget=None, substeps=None, max_sweeps=64):
+        if engine not in self.engines:
+            raise ValueError('unknown engine ' + repr(engine))
+        if budget is not None and engine != 'overlap':
+            raise ValueError('a collision budget needs the overlap engine')
+        if contact_cache and engine != 'overlap':
+            raise ValueError('a contact cache needs the overlap engine')
+        if engine in ('chains', 'events'):
+            for name, value in (('broadphase', broadphase), ('sleep_after', sleep_after), ('substeps', substeps)):
+                if value is not None:
+                    raise ValueError(name + ' needs the overlap or islands engine')
+        self.world = World()
+        self.entities = scene(surface, self.world)
+        self.group = Collidable.collision_group(self.world)
+        self.engine = engine
+        self.broadphase = broadphases[broadphase]() if isinstance(broadphase, str) else broadphase
+        self.scheduler = EventScheduler(self.world) if engine == 'events' else None
+        if engine == 'chains' and not self.world.along_x(numpy.flatnonzero(self.world.movable)):
+            raise ValueError('the chains engine only resolves collisions along x, but the bodies do not all lie and move along x')
+        self.cache = ContactCache() if contact_cache else None
+        if substeps is not None and (substeps < 1 or substeps & (substeps - 1)):
+            raise ValueError('substeps must be a power of two, not ' + repr(substeps))
+        if sleep_after is not None and sleep_after < 1:
+            raise ValueError('bodies must be still for at least one step to sleep, not ' + repr(sleep_after))
+        self.budget = budget
+        self.max_sweeps = max_sweeps
+        self.substeps = substeps
+        self.sleep_after = sleep_after
+        self.awake = None
+        self.dt = dt
+        self.steps = 0
+        self.passes = 0
+        self.resolved = 0
+        self.recorder = None
+        self.ring = None
+        self.conservation = None
+        if sleep_after is not None:
+            # bodies at rest can fall asleep before their CollisionBox was ever stretched
+            self.collision_boxes()
+
+    def step(self):
+        """Advances the World by one time step"""
+        self.world.save_previous()
+        if self.engine == 'events':
+            with profiler.phase('events'):
+                events = self.scheduler.advance(self.dt)
+            self.passes += 1
+            self.resolved += events
+            profiler.count('resolved_pairs', events)
+        elif self.engine == 'chains':
+            with profiler.phase('chains'):
+                sweeps, resolved = resolve_chains(self.world, time=self.dt, max_sweeps=self.max_sweeps)
+            with profiler.phase('move'):
+                self.world.move(self.dt)
+            self.passes += sweeps
+            self.resolved += resolved
+            profiler.count('passes', sweeps)
+            profiler.count('resolved_pairs', resolved)
+        elif self.substeps is not None:
+            self.multirate()
+        else:
+            with profiler.phase('move'):
+                self.move()
+            with profiler.phase('collision_box'):
+                self.collision_boxes()
+            with profiler.phase('collision'):
+                self.collide()
+        self.steps += 1
+        if self.recorder is not None:
+            self.recorder.record()
+        if self.ring is not None and self.steps % self.ring.every == 0:
+            self.ring.take(self)
+        if self.conservation is not None and self.steps % self.conservation.every == 0:
+            self.conservation.check()
+
+    def record(self, path, every=1, chunk=None):
+        """Starts recording the World to a trajectory file, from the current step, every few steps"""
+        self.recorder = TrajectoryRecorder(path, self.world, every, chunk)
+        self.recorder.record()
+        return self.recorder
+
+    def snapshot(self, out=None):
+        """Returns a Snapshot of the complete state, reusing the arrays of out when given
+
+        >>> simulation = Simulation()
+        >>> simulation.run(30) > 0
+        True
+        >>> snapshot = simulation.snapshot()
+        >>> simulation.run(40) > 0
+        True
+        >>> after = simulation.world.snapshot()
+        >>> simulation.restore(snapshot)
+        >>> simulation.run(40) > 0
+        True
+        >>> bool((simulation.world.snapshot() == after).all()), simulation.steps
+        (True, 70)
+
+        The boxes a CollisionBudget carries over to the next step are part of the state
+
+        >>> simulation = Simulation(scenes['gas'], budget=CollisionBudget(passes=1))
+        >>> simulation.run(25) > 0
+        True
+        >>> snapshot = simulation.snapshot()
+        >>> simulation.run(40) > 0
+        True
+        >>> after, frames = simulation.world.snapshot(), simulation.budget.frames
+        >>> simulation.restore(snapshot)
+        >>> simulation.run(40) > 0
+        True
+        >>> bool((simulation.world.snapshot() == after).all()), simulation.budget.frames == frames
+        (True, True)
+        """
+        world = self.world.snapshot(None if out is None else out.world)
+        scheduler = None if self.scheduler is None else self.scheduler.snapshot()
+        budget = None if self.budget is None else self.budget.snapshot()
+        return Snapshot(self.steps, world, self.passes, self.resolved, scheduler, budget)
+
+    def restore(self, snapshot):
+        """Puts the Simulation back in the state of a Snapshot"""
+        self.world.restore(snapshot.world)
+        self.steps, self.passes, self.resolved = snapshot.step, snapshot.passes, snapshot.resolved
+        if self.scheduler is not None:
+            self.scheduler.restore(snapshot.scheduler)
+        if self.budget is not None:
+            self.budget.restore(snapshot.budget)
+        self.awake = None
+        self.collision_boxes()
+
+    def keep_snapshots(self, capacity=8, every=200):
+        """Starts keeping a SnapshotRing of the last capacity snapshots, one every few steps"""
+        self.ring = SnapshotRing(capacity, every)
+        return self.ring
+
+    def watch_conservation(self, every=100, tolerance=1e-6, action='raise'):
+        """Starts checking every few steps that energy and momentum stay as they are now
+
+        >>> simulation = Simulation(scenes['gas'])
+        >>> monitor = simulation.watch_conservation(every=10, tolerance=1e-9)
+        >>> simulation.run(100) > 0
+        True
+        >>> monitor.checks, monitor.worst < (1e-9, 1e-9)
+        (10, True)
+        """
+        self.conservation = ConservationMonitor(self.world, every, tolerance, action)
+        return self.conservation
+
+    def move(self):
+        """Moves every movable body of the World in one update and, when bodies can sleep, finds
+        the ones that are awake"""
+        self.world.move(self.dt)
+        if self.sleep_after is not None:
+            self.awake = self.awake_entities()
+
+    def rates(self):
+        """Returns the substeps each body takes in the next step: enough powers of two for it to
+        travel no further than its smallest dim in a substep, up to substeps
+
+        >>> simulation = Simulation(scenes['gas'], substeps=4)
+        >>> simulation.world.vel[:3] = [[0, 0], [15, 0], [0, -90]]
+        >>> simulation.world.dim[:3].tolist(), simulation.rates()[:3].tolist()
+        ([[10.0, 10.0], [10.0, 10.0], [10.0, 10.0]], [1, 2, 4])
+        """
+        world = self.world
+        size = world.dim.min(axis=1)
+        speed = numpy.sqrt(numpy.einsum('ij,ij->i', world.vel, world.vel))
+        needed = numpy.divide(speed * self.dt, size, out=numpy.zeros(world.count), where=size > 0)
+        rates = 2 ** numpy.ceil(numpy.log2(numpy.maximum(needed, 1)))
+        return numpy.minimum(rates, self.substeps).astype(int)
+
+    def multirate(self):
+        """Takes a step in as many substeps as the fastest body needs
+
+        Every body moves in every substep, but a body only stretches its CollisionBox, over its
+        own substep, and is scanned at the start of each of its own substeps. A slow body's
+        box covers the whole step, so a fast body's tight box still meets it. A pair resolves
+        only once the impact falls within the reach of both boxes.
+
+        >>> plain, single = Simulation(scenes['field']), Simulation(scenes['field'], substeps=1)
+        >>> plain.run(100) > 0 and single.run(100) > 0
+        True
+        >>> bool((plain.world.pos == single.world.pos).all())
+        True
+        >>> substepped = Simulation(scenes['field'], substeps=8)
+        >>> monitor = substepped.watch_conservation(every=10, tolerance=1e-9)
+        >>> substepped.run(100) > 0, monitor.checks
+        (True, 10)
+
+        Bodies loaded from a scene file get their entities when they are first due
+
+        >>> import os, tempfile
+        >>> world = World()
+        >>> _ = scenes['field'](None, world)
+        >>> path = os.path.join(tempfile.mkdtemp(), 'field.scene')
+        >>> write_scene(path, world)
+        >>> loaded, built = Simulation(file_scene(path), substeps=4), Simulation(scenes['field'], substeps=4)
+        >>> loaded.run(50) > 0 and built.run(50) > 0
+        True
+        >>> loaded.resolved > 0, loaded.resolved == built.resolved, bool((loaded.world.pos == built.world.pos).all())
+        (True, True, True)
+        """
+        world = self.world
+        rates = self.rates()
+        count = int(rates.max(initial=1))
+        awake = numpy.ones(world.count, dtype=bool) if self.sleep_after is None else ~world.settle(self.sleep_after)
+        for substep in range(count):
+            with profiler.phase('move'):
+                world.move(self.dt / count)
+            due = [entity for entity in map(self.entity, numpy.flatnonzero(awake & (substep % (count // rates) == 0)))
+                   if isinstance(entity, Collidable)]
+            with profiler.phase('collision_box'):
+                for entity in due:
+                    entity.reach = self.dt / rates[entity.row]
+                    entity.collision_box()
+            with profiler.phase('collision'):
+                self.collide([entity.box for entity in due])
+
+    def awake_entities(self):
+        """Returns the Collidables that have not been still for sleep_after steps
+
+        >>> simulation = Simulation(sleep_after=2)
+        >>> simulation.run(3) > 0
+        True
+        >>> len(simulation.entities), [type(entity).__name__ for entity in simulation.awake]
+        (9, ['Orb1'])
+
+        Bodies that sleep from the first step on still stop the ones that hit them
+
+        >>> plain, sleeping = Simulation(), Simulation(sleep_after=1)
+        >>> plain.run(300) > 0 and sleeping.run(300) > 0
+        True
+        >>> sleeping.resolved == plain.resolved > 0, bool((sleeping.world.pos == plain.world.pos).all())
+        (True, True)
+        >>> Simulation(sleep_after=0)
+        Traceback (most recent call last):
+        ...
+        ValueError: bodies must be still for at least one step to sleep, not 0
+
+        Bodies loaded from a scene file get their entities when they are first awake
+
+        >>> import os, tempfile
+        >>> world = World()
+        >>> _ = scenes['gas'](None, world)
+        >>> path = os.path.join(tempfile.mkdtemp(), 'gas.scene')
+        >>> write_scene(path, world)
+        >>> loaded, built = Simulation(file_scene(path), sleep_after=2), Simulation(scenes['gas'], sleep_after=2)
+        >>> loaded.run(50) > 0 and built.run(50) > 0
+        True
+        >>> loaded.resolved > 0, loaded.resolved == built.resolved, bool((loaded.world.pos == built.world.pos).all())
+        (True, True, True)
+        """
+        awake = []
+        for row in numpy.flatnonzero(~self.world.settle(self.sleep_after)):
+            entity = self.entity(row)
+            if isinstance(entity, Collidable):
+                awake.append(entity)
+        return awake
+
+    def entity(self, row):
+        """Returns the entity of a row of the World, creating it when the scene loads its
+        entities lazily and it was not used yet"""
+        entity = self.world.entities[row]
+        return self.entities[row] if entity is None else entity
+
+    def collision_boxes(self):
+        """Stretches the CollisionBox of every awake Collidable over its motion in the next
+        time step, so that impacts are resolved within dt whatever its length
+
+        >>> simulation = Simulation(scenes['gas'], dt=2)
+        >>> order = numpy.argsort(simulation.world.pos[:, 0])
+        >>> simulation.run(100) > 0
+        True
+        >>> bool((numpy.argsort(simulation.world.pos[:, 0]) == order).all())
+        True
+        """
+        for entity in self.entities if self.awake is None else self.awake:
+            if isinstance(entity, Collidable):
+                entity.reach = self.dt
+                entity.collision_box()
+
+    def collide(self, active=None):
+        """Resolves the overlapping CollisionBoxes, scanning only the active ones when given"""
+        if active is None and self.awake is not None:
+            active = [entity.box for entity in self.awake]
+        if self.engine == 'islands':
+            passes, calls = resolve_islands(self.group, self.broadphase, active=active)
+        else:
+            passes, calls = collision(self.group, self.broadphase, poll_events=False, cache=self.cache, active=active, budget=self.budget)
+        self.passes += passes
+        self.resolved += calls
+
+    def draw(self, alpha=1):
+        """Draws every entity alpha of the way from the previous step to the current one"""
+        for entity in self.entities:
+            entity.draw(alpha=alpha)
+
+    def run(self, steps):
+        """Takes the given number of steps and returns the steps per second. While the profiler
+        is enabled each step is recorded as a frame"""
+        start = time.perf_counter()
+        if profiler.enabled:
+            for _ in range(steps):
+                begin = time.perf_counter()
+                self.step()
+                profiler.frame(time.perf_counter() - begin)
+        else:
+            for _ in range(steps):
+                self.step()
+        elapsed = time.perf_counter() - start
+        return steps / elapsed if elapsed else float('inf')
+
+
+def main(args=None):
+    """Runs a scene without a display and prints the steps per second; on its own defaults it
+    runs the default scene with the overlap engine
+
+    >>> main(['--steps', '300']) # doctest: +ELLIPSIS
+    300 steps in default with overlap: ... steps/sec
+    """
+    parser = argparse.ArgumentParser(description='Runs a scene without a display')
+    parser.add_argument('--scene', default='default', choices=sorted(scenes))
+    parser.add_argument('--scene-file', help='scene file to load instead of a named scene')
+    parser.add_argument('--steps', type=int, default=1000)
+    parser.add_argument('--dt', type=float, default=1)
+    parser.add_argument('--engine', default='overlap', choices=Simulation.engines)
+    parser.add_argument('--broadphase', default=None, choices=sorted(broadphases))
+    parser.add_argument('--contact-cache', action='store_true', help='keep the colliding pairs between steps')
+    parser.add_argument('--sleep', type=int, metavar='STEPS', help='put bodies to sleep after STEPS steps without velocity')
+    parser.add_argument('--max-sweeps', type=int, default=64, help='most sweeps of the chains engine in a step')
+    parser.add_argument('--max-passes', type=int, help='most collision passes in a step')
+    parser.add_argument('--max-resolutions', type=int, help='most resolved impacts in a step')
+    parser.add_argument('--substeps', type=int, help='most substeps, a power of two, a fast body takes in a step')
+    parser.add_argument('--record', help='trajectory file to record the positions and velocities to')
+    parser.add_argument('--every', type=int, default=1, help='steps between recorded frames')
+    parser.add_argument('--check-conservation', type=int, metavar='STEPS', help='check energy and momentum every STEPS steps')
+    parser.add_argument('--tolerance', type=float, default=1e-6, help='relative drift allowed by --check-conservation')
+    parser.add_argument('--profile', help='JSON or CSV file to write the phase times and counters to')
+    args = parser.parse_args(args)
+
+    scene = file_scene(args.scene_file) if args.scene_file else scenes[args.scene]
+    budget = CollisionBudget(args.max_passes, args.max_resolutions) if args.max_passes or args.max_resolutions else None
+    simulation = Simulation(scene, args.engine, args.broadphase, args.dt, contact_cache=args.contact_cache,
+                            sleep_after=args.sleep, budget=budget, substeps=args.substeps, max_sweeps=args.max_sweeps)
+    if args.record:
+        simulation.record(args.record, args.every)
+    if args.check_conservation:
+        simulation.watch_conservation(args.check_conservation, args.tolerance)
+    if args.profile:
+        profiler.enable()
+    rate = simulation.run(args.steps)
+    print('%d steps in %s with %s: %.1f steps/sec' % (args.steps, args.scene_file or args.scene, args.engine, rate))
+    if budget is not None:
+        print('%d of %d steps ran out of budget, at most %d passes, %d contacts left over' % (
+            budget.exhausted_frames, budget.frames, budget.most_passes, budget.residual))
+    if args.record:
+        simulation.recorder.close()
+    if args.profile:
+        profiler.disable()
+        profiler.write(args.profile)
+
+
+if __name__ == "__main__":
+    main()
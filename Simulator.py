@@ -10,11 +10,17 @@
 
 import pygame, sys
 
-from Entity import *
-from Collision import *
+from Simulation import *
+from Renderer import *
 
 def main():
-    """This is the main function which contains the Game Loop"""
+    """This is the main function which contains the Game Loop
+
+    Physics runs at its own fixed rate, taking as many steps as the time since the last frame
+    allows, and every frame is drawn between the last two physics steps. SPACE takes a single
+    step and holding RSHIFT runs the physics. P turns the profiler on and, when it is turned
+    off again, writes what it measured to profile.json.
+    """
 
     pygame.init()
 
@@ -27,60 +33,59 @@ def main():
 
     # Clock
     clock = pygame.time.Clock()
+    frame_rate = 120 # frames drawn per second at most
+    physics_rate = 120 # physics steps per second, whatever the frame rate
+    step_time = 1000 / physics_rate # milliseconds of physics per step
+    max_steps = 8 # per frame, so a slow frame cannot snowball
+    accumulator = 0
 
     #Initialize
-    # character = Character([1,1], [100,100], [100,100,100], surface, 100, 100000000)
-    o0 = Orb0([0, 250], [40, 40], [0, 255, 0], surface, 1000000000, 100000000)
-    o1 = Orb1([41, 250], [40, 40], [0, 0, 255], surface, 1, 100000000)
-    o2 = Orb3([200, 250], [40, 40], [255, 0, 0], surface, 1, 100000000)
-    o21 = Orb2([241, 250], [40, 40], [255, 0, 0], surface, 1, 100000000)
-    o22 = Orb2([282, 250], [40, 40], [255, 0, 0], surface, 1, 100000000)
-    o23 = Orb2([323, 250], [40, 40], [255, 0, 0], surface, 1, 100000000)
-    o24 = Orb2([364, 250], [40, 40], [255, 0, 0], surface, 1, 100000000)
-    # o25 = Orb2([405, 250], [40, 40], [255, 0, 0], surface, 1, 100000000)
-    # o26 = Orb2([446, 250], [40, 40], [255, 0, 0], surface, 1, 100000000)
-    o3 = Orb2([487, 250], [40, 40], [0, 255, 255], surface, 1, 100000000)
-    o4 = Orb4([600, 250], [40, 40], [255, 0, 255], surface, 100000000000, 100000000)
+    simulation = Simulation(surface=surface)
+    renderer = DirtyRenderer(surface)
 
 
     # Game Loop
     while True:
 
         # Framerate
-        clock.tick(120)
+        accumulator += clock.tick(frame_rate)
+        profiler.frame(clock.get_rawtime() / 1000)
 
         # Event Loop
         for event in pygame.event.get():
             if event.type == pygame.QUIT or pygame.key.get_pressed()[pygame.K_ESCAPE]:
                 sys.exit()
-
-        if pygame.key.get_pressed()[pygame.K_SPACE] and not held or pygame.key.get_pressed()[pygame.K_RSHIFT]:
-            held = 1
-
-            # Draw
-            # character.draw()
-            o0.draw()
-            o1.draw()
-            o2.draw()
-            o21.draw()
-            o22.draw()
-            o23.draw()
-            o24.draw()
-            # o25.draw()
-            # o26.draw()
-            o3.draw()
-            o4.draw()
-
-            # Collision
-            collision(CollisionBox.entity_group)
-
-            # Update and Fill
-            pygame.display.flip()
-            surface.fill((0, 0, 0))
-
-        elif not pygame.key.get_pressed()[pygame.K_SPACE] and held:
-            held = 0
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_p:
+                if profiler.enabled:
+                    profiler.disable()
+                    profiler.write('profile.json')
+                else:
+                    profiler.reset()
+                    profiler.enable()
+
+        # Physics
+        alpha = 1
+        if pygame.key.get_pressed()[pygame.K_RSHIFT]:
+            steps = 0
+            while accumulator >= step_time and steps < max_steps:
+                simulation.step()
+                accumulator -= step_time
+                steps += 1
+            if steps == max_steps:
+                accumulator = 0
+            alpha = accumulator / step_time
+        else:
+            accumulator = 0
+            if pygame.key.get_pressed()[pygame.K_SPACE] and not held:
+                held = 1
+                simulation.step()
+            elif not pygame.key.get_pressed()[pygame.K_SPACE] and held:
+                held = 0
+
+        # Draw and Update
+        with profiler.phase('draw'):
+            renderer.draw(simulation.entities, alpha)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,114 @@
+#################
+### S W E E P ###
+#################
+
+
+# Contains the parameter sweep runner
+#
+# A sweep runs the Simulator setup once for every combination of the given parameters, each
+# in its own headless Simulation spread over a pool of processes, and collects a summary of
+# every run into one table:
+#
+#     python Sweep.py --heavy-mass 1e9 1e3 --striker-speed 5 10 20 --steps 500 --output sweep.csv
+
+
+import argparse, concurrent.futures, csv, inspect, itertools, math
+
+from Simulation import *
+from Energy import *
+
+
+# parameters of a scenario that configure the Simulation rather than the scene
+run_defaults = {'steps': 200, 'engine': 'overlap', 'broadphase': None, 'dt': 1}
+
+scene_defaults = {name: parameter.default for name, parameter in inspect.signature(simulator_scene).parameters.items()}
+
+
+def grid(**axes):
+    """Returns a scenario for every combination of the values of each parameter
+
+    >>> grid(heavy_mass=[1, 10], striker_speed=[5])
+    [{'heavy_mass': 1, 'striker_speed': 5}, {'heavy_mass': 10, 'striker_speed': 5}]
+    """
+    names = list(axes)
+    return [dict(zip(names, values)) for values in itertools.product(*(axes[name] for name in names))]
+
+
+def run_scenario(scenario):
+    """Runs one scenario headless and returns its parameters with a summary of the outcome
+
+    The summary holds the final velocity of every body along x and y, the total kinetic
+    energy from Energy.calc_kinetic, the total momentum and the number of collisions.
+
+    >>> result = run_scenario({'striker_speed': 4, 'steps': 100})
+    >>> result['collisions'] > 0, round(result['kinetic_energy'], 6), round(result['momentum_x'], 6)
+    (True, 8.0, 4.0)
+    """
+    scene_params = {name: scenario[name] for name in scenario if name in scene_defaults}
+    run_params = dict(run_defaults, **{name: scenario[name] for name in scenario if name in run_defaults})
+    unknown = set(scenario) - set(scene_defaults) - set(run_defaults)
+    if unknown:
+        raise ValueError('unknown scenario parameters ' + ', '.join(sorted(unknown)))
+
+    simulation = Simulation(simulator_scene(**scene_params), run_params['engine'], run_params['broadphase'], run_params['dt'])
+    simulation.run(run_params['steps'])
+
+    world, energy = simulation.world, Energy()
+    velocities = world.vel.tolist()
+    momentum = (world.mass[:, None] * world.vel).sum(0).tolist()
+    return dict(
+        dict(scene_defaults, **run_params, **scene_params),
+        final_velocities_x=[velocity[0] for velocity in velocities],
+        final_velocities_y=[velocity[1] for velocity in velocities],
+        kinetic_energy=sum(energy.calc_kinetic(mass, math.hypot(*velocity)) for mass, velocity in zip(world.mass.tolist(), velocities)),
+        momentum_x=momentum[0],
+        momentum_y=momentum[1],
+        collisions=simulation.resolved,
+        passes=simulation.passes,
+    )
+
+
+def sweep(scenarios, workers=None):
+    """Runs every scenario in a pool of processes, one per core unless workers is given, and
+    returns their summaries in the order of the scenarios
+
+    >>> [result['striker_speed'] for result in sweep(grid(striker_speed=[1, 2], steps=[5]), workers=2)]
+    [1, 2]
+    """
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(run_scenario, scenarios))
+
+
+def write_table(results, path):
+    """Writes the summaries as CSV, one row per scenario; lists are joined with spaces"""
+    with open(path, 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=list(results[0]))
+        writer.writeheader()
+        for result in results:
+            writer.writerow({name: ' '.join(map(str, value)) if isinstance(value, list) else value
+                             for name, value in result.items()})
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Runs the Simulator setup for every combination of the given parameters')
+    for name, default in scene_defaults.items():
+        parser.add_argument('--' + name.replace('_', '-'), nargs='+', type=float, default=[default])
+    parser.add_argument('--steps', nargs='+', type=int, default=[run_defaults['steps']])
+    parser.add_argument('--engine', nargs='+', default=[run_defaults['engine']], choices=Simulation.engines)
+    parser.add_argument('--workers', type=int, help='processes to use, one per core by default')
+    parser.add_argument('--output', help='CSV file to write the table to')
+    args = parser.parse_args(args)
+
+    axes = {name: getattr(args, name) for name in list(scene_defaults) + ['steps', 'engine']}
+    results = sweep(grid(**axes), args.workers)
+
+    columns = [name for name in axes if len(axes[name]) > 1] + ['kinetic_energy', 'momentum_x', 'collisions']
+    print(''.join('%16s' % name for name in columns))
+    for result in results:
+        print(''.join('%16.6g' % result[name] if isinstance(result[name], (int, float)) else '%16s' % result[name] for name in columns))
+    if args.output:
+        write_table(results, args.output)
+
+
+if __name__ == "__main__":
+    main()
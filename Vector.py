@@ -8,47 +8,108 @@
 # These Vectors are all initiated such that they are relative to the entity they are describing;
 # as a result, they do not have their own position value, since Vectors are still the same
 # regardless of the position of the Vectors.
+#
+# The VectorArray classes are the batched counterparts of the Vector classes. They hold one
+# signed value per element in a NumPy array and follow the same operator rules.
+
+
+import numpy
 
 
 class Vector:
-    """A single variable Vector that has direction and magnitude"""
+    """A single variable Vector that has direction and magnitude
+
+    The Vector is stored as the single signed value direction*magnitude. A direction that is
+    set while the magnitude is zero is remembered for when the magnitude is set afterwards.
+    Vectors that come out of create_vector or arithmetic and are zero are shared, one per
+    class, and cannot be changed.
+
+    >>> Vector.create_vector(Position, 0).value = 5
+    Traceback (most recent call last):
+    ...
+    AttributeError: shared zero Position cannot be changed
+    >>> (Position(1, 3) - Position(1, 3)).value
+    0
+    """
+
+    __slots__ = ('_value', '_direction')
 
     def __init__(self, direction, magnitude):
+        self._value = direction * magnitude
         self._direction = direction
-        self.magnitude = magnitude
 
+    @staticmethod
     def create_vector(vector_type, value):
-        """This creates a vector using a scalar value
+        """This creates a vector of the given class using a scalar value
 
-        >>> x = Vector.create_vector("Vector", 10)
+        >>> x = Vector.create_vector(Vector, 10)
         >>> x.direction, x.magnitude
         (1.0, 10)
+        >>> Vector.create_vector(Position, 0) is Position.zero
+        True
         """
         if value == 0:
-            return globals()[vector_type](0, 0)
-        else:
-            return globals()[vector_type](value/abs(value), abs(value))
+            return vector_type.zero
+        result = object.__new__(vector_type)
+        result._value = value
+        return result
+
+    def _new(self, value):
+        """Creates a Vector of the same kind as this one"""
+        if value == 0:
+            return type(self).zero
+        result = object.__new__(type(self))
+        result._value = value
+        return result
+
+    def _check_shared(self):
+        if self is type(self).zero:
+            raise AttributeError('shared zero ' + type(self).__name__ + ' cannot be changed')
+
+    @property
+    def value(self):
+        return self._value
+
+    @value.setter
+    def value(self, value):
+        self._check_shared()
+        self._value = value
 
     @property
     def direction(self):
-        if self.magnitude == 0:
-            return 0
-        else:
-            return self._direction
+        value = self.value
+        if value > 0:
+            return 1.0
+        if value < 0:
+            return -1.0
+        return 0
 
     @direction.setter
-    def direction(self, value):
-        self._direction = value
+    def direction(self, direction):
+        self._check_shared()
+        self._direction = direction
+        self.value = direction * abs(self.value)
+
+    @property
+    def magnitude(self):
+        return abs(self.value)
+
+    @magnitude.setter
+    def magnitude(self, magnitude):
+        self._check_shared()
+        value = self.value
+        if value != 0:
+            self._direction = 1.0 if value > 0 else -1.0
+        self.value = getattr(self, '_direction', 0) * magnitude
 
     def __add__(self, other):
         """Basic left side addition with Vectors
 
         Look at __radd__ for doctests
         """
-        result = self.direction*self.magnitude + other.direction*other.magnitude
-        if result == 0:
-            return type(self)(0, 0)
-        return type(self)(result/abs(result), abs(result))
+        if isinstance(other, VectorArray):
+            return NotImplemented
+        return self._new(self.value + other.value)
 
     def __radd__(self, other):
         """Basic right side addition with Vectors
@@ -61,11 +122,13 @@ class Vector:
         return self + other
 
     def __sub__(self, other):
-        """Basic left side subtraction with Vectors
+        """Basic left side subtraction with Vectors, which gives float values
 
         look at __rsub__ for doctests
         """
-        return self + -1*other
+        if isinstance(other, VectorArray):
+            return NotImplemented
+        return self._new(self.value - float(other.value))
 
     def __rsub__(self, other):
         """Basic right side addition with Vectors
@@ -75,7 +138,10 @@ class Vector:
         >>> new_x.direction, new_x.magnitude
         (-1.0, 14.0)
         """
-        return other + -1*self
+        return self._new(other.value - float(self.value))
+
+    def __neg__(self):
+        return self._new(-self.value)
 
     def scalar_mul(self, other):
         """This is multiplication of a scalar and a Vector
@@ -85,9 +151,7 @@ class Vector:
         >>> new_x.direction, new_x.magnitude
         (-1.0, 36)
         """
-        if other == 0:
-            return type(self)(0, 0)
-        return type(self)(self.direction*(other/abs(other)), abs(self.magnitude*other))
+        return self._new(self.value * other)
 
     def dot_product(self, other):
         """This is scalar product of two Vectors
@@ -96,7 +160,7 @@ class Vector:
         >>> x.dot_product(y)
         -36
         """
-        return self.direction*self.magnitude * other.direction*other.magnitude
+        return self.value * other.value
 
     def __mul__(self, other):
         """This is the left side default scalar multiplication or dot product
@@ -112,6 +176,7 @@ class Vector:
             return self.scalar_mul(other)
         if isinstance(other, Vector):
             return self.dot_product(other)
+        return NotImplemented
 
     def __rmul__(self, other):
         """This is the right side default scalar multiplication or dot product
@@ -135,7 +200,7 @@ class Vector:
         >>> new_x.direction, new_x.magnitude
         (-1.0, 3.0)
         """
-        return self * (1/other)
+        return self._new(self.value / other)
 
     def __pow__(self, power):
         """This is dot product of itself
@@ -145,8 +210,8 @@ class Vector:
         36
         """
         if power % 2 == 0:
-            return self.magnitude ** power
-        return type(self)(self.direction, self.magnitude ** power)
+            return abs(self.value) ** power
+        return self._new(self.direction * abs(self.value) ** power)
 
     def __abs__(self):
         """This is the absolute value of a vector
@@ -155,7 +220,7 @@ class Vector:
         >>> abs(x)
         6
         """
-        return self.magnitude
+        return abs(self.value)
 
     def __lt__(self, other):
         """This is the less than operator
@@ -170,7 +235,7 @@ class Vector:
         >>> left < right
         False
         """
-        return self.direction * self.magnitude < other.direction * other.magnitude
+        return self.value < other.value
 
     def __le__(self, other):
         """This is the less than or equal to operator
@@ -185,7 +250,7 @@ class Vector:
         >>> left <= right
         False
         """
-        return self.direction * self.magnitude <= other.direction * other.magnitude
+        return self.value <= other.value
 
     def __eq__(self, other):
         """This is the equal to operator
@@ -200,7 +265,7 @@ class Vector:
         >>> left == right
         False
         """
-        return self.direction * self.magnitude == other.direction * other.magnitude
+        return self.value == other.value
 
     def __ge__(self, other):
         """This is the greater than or equal to operator
@@ -215,7 +280,7 @@ class Vector:
         >>> left >= right
         True
         """
-        return self.direction * self.magnitude >= other.direction * other.magnitude
+        return self.value >= other.value
 
     def __gt__(self, other):
         """This is the greater than operator
@@ -230,12 +295,14 @@ class Vector:
         >>> left > right
         True
         """
-        return self.direction * self.magnitude > other.direction * other.magnitude
+        return self.value > other.value
 
 
 class Position(Vector):
     """Single variable Position Vector"""
 
+    __slots__ = ()
+
     def __init__(self, direction, distance):
         super().__init__(direction, distance)
 
@@ -249,12 +316,14 @@ class Position(Vector):
         >>> vel_x.magnitude
         5.0
         """
-        return Velocity(self.direction*(time/abs(time)), self.magnitude/abs(time))
+        return Vector.create_vector(Velocity, self.value / time)
 
 
 class Velocity(Vector):
     """Single variable Velocity Vector"""
 
+    __slots__ = ()
+
     def __init__(self, direction, speed):
         super().__init__(direction, speed)
 
@@ -268,7 +337,7 @@ class Velocity(Vector):
         >>> pos_x.magnitude
         20
         """
-        return Position(self.direction*(time/abs(time)), self.magnitude*abs(time))
+        return Vector.create_vector(Position, self.value * time)
 
     def calc_acceleration(self, time=1):
         """This calculates the velocity of the object given a certain time
@@ -280,12 +349,14 @@ class Velocity(Vector):
         >>> accel_x.magnitude
         5.0
         """
-        return Acceleration(self.direction*(time/abs(time)), self.magnitude/abs(time))
+        return Vector.create_vector(Acceleration, self.value / time)
 
 
 class Acceleration(Vector):
     """Single variable Acceleration Vector"""
 
+    __slots__ = ()
+
     def __init__(self, direction, magnitude):
         super().__init__(direction, magnitude)
 
@@ -299,14 +370,17 @@ class Acceleration(Vector):
         >>> vel_x.magnitude
         20
         """
-        return Velocity(self.direction*(time/abs(time)), self.magnitude*abs(time))
+        return Vector.create_vector(Velocity, self.value * time)
 
 
 class Momentum(Vector):
     """Single variable Momentum Vector, descriptor of Velocity"""
 
+    __slots__ = ('mass', 'velocity')
+
     def __init__(self, mass, velocity):
-        super().__init__(velocity.direction, mass*velocity.magnitude)
+        self._value = mass * velocity.value
+        self._direction = velocity.direction
         self.mass = mass
         self.velocity = velocity
         
@@ -326,8 +400,11 @@ class Momentum(Vector):
 class Force(Vector):
     """Single variable Force Vector, descriptor of Acceleration"""
 
+    __slots__ = ('mass', 'acceleration')
+
     def __init__(self, mass, acceleration):
-        super().__init__(acceleration.direction, mass*acceleration.magnitude)
+        self._value = mass * acceleration.value
+        self._direction = acceleration.direction
         self.mass = mass
         self.acceleration = acceleration
         
@@ -341,4 +418,351 @@ class Force(Vector):
         >>> mom_x.magnitude
         20
         """
-        return Momentum(self.mass, self.acceleration.calc_velocity(time))
\ No newline at end of file
+        return Momentum(self.mass, self.acceleration.calc_velocity(time))
+
+
+for vector_type in (Vector, Position, Velocity, Acceleration, Momentum, Force):
+    vector_type.zero = object.__new__(vector_type)
+    vector_type.zero._value = 0
+
+
+class VectorArray:
+    """Many single variable Vectors stored as one array of signed values"""
+
+    __slots__ = ('value',)
+    __array_ufunc__ = None
+    scalar_type = Vector
+
+    def __init__(self, direction, magnitude):
+        self.value = numpy.multiply(direction, magnitude, dtype=float)
+
+    @classmethod
+    def _from_value(cls, value):
+        result = cls.__new__(cls)
+        result.value = value
+        return result
+
+    def create_vector(vector_type, value):
+        """This creates a VectorArray using an array of scalar values. The values are
+        shared, not copied, when they already are a float array
+
+        >>> x = VectorArray.create_vector(VectorArray, [10, 0, -3])
+        >>> x.direction.tolist(), x.magnitude.tolist()
+        ([1.0, 0.0, -1.0], [10.0, 0.0, 3.0])
+        """
+        return vector_type._from_value(numpy.asarray(value, dtype=float))
+
+    def from_vectors(vector_type, vectors):
+        """This creates a VectorArray out of single variable Vectors
+
+        >>> x = VectorArray.from_vectors(PositionArray, [Position(1, 4), Position(-1, 2)])
+        >>> x.direction.tolist(), x.magnitude.tolist()
+        ([1.0, -1.0], [4.0, 2.0])
+        """
+        return vector_type._from_value(numpy.array([vector.value for vector in vectors], dtype=float))
+
+    def _new(self, value):
+        """Creates a VectorArray of the same kind as this one"""
+        return type(self)._from_value(value)
+
+    @property
+    def direction(self):
+        return numpy.sign(self.value) + 0.0
+
+    @property
+    def magnitude(self):
+        return numpy.abs(self.value)
+
+    def __len__(self):
+        return len(self.value)
+
+    def __iter__(self):
+        return (self[index] for index in range(len(self)))
+
+    def __getitem__(self, index):
+        """Integers give a single Vector and anything else gives a VectorArray
+
+        >>> x = VelocityArray([1, -1, 1], [3, 5, 0])
+        >>> single = x[1]
+        >>> type(single).__name__, single.direction, single.magnitude
+        ('Velocity', -1.0, 5.0)
+        >>> x[1:].magnitude.tolist()
+        [5.0, 0.0]
+        """
+        value = self.value[index]
+        if numpy.ndim(value) == 0:
+            return Vector.create_vector(self.scalar_type, float(value))
+        return self._new(value)
+
+    def __setitem__(self, index, other):
+        self.value[index] = other.value
+
+    def to_vectors(self):
+        """This returns a list of single variable Vectors
+
+        >>> [(x.direction, x.magnitude) for x in PositionArray([1, 0], [4, 0]).to_vectors()]
+        [(1.0, 4.0), (0, 0)]
+        """
+        return list(self)
+
+    def __add__(self, other):
+        """Basic left side addition with Vectors or VectorArrays
+
+        Look at __radd__ for doctests
+        """
+        return self._new(self.value + other.value)
+
+    def __radd__(self, other):
+        """Basic right side addition with Vectors or VectorArrays
+
+        >>> x, add_x = VectorArray([1, 1], [10, 2]), Vector(-1, 4)
+        >>> new_x = add_x + x
+        >>> new_x.direction.tolist(), new_x.magnitude.tolist()
+        ([1.0, -1.0], [6.0, 2.0])
+        """
+        return self + other
+
+    def __sub__(self, other):
+        """Basic left side subtraction with Vectors or VectorArrays
+
+        look at __rsub__ for doctests
+        """
+        return self._new(self.value - other.value)
+
+    def __rsub__(self, other):
+        """Basic right side subtraction with Vectors or VectorArrays
+
+        >>> x, sub_x = VectorArray([1, -1], [10, 4]), Vector(-1, 4)
+        >>> new_x = sub_x - x
+        >>> new_x.direction.tolist(), new_x.magnitude.tolist()
+        ([-1.0, 0.0], [14.0, 0.0])
+        """
+        return self._new(other.value - self.value)
+
+    def __neg__(self):
+        return self._new(-self.value)
+
+    def scalar_mul(self, other):
+        """This is multiplication of scalars and a VectorArray
+
+        >>> x = VectorArray([-1, 1], [4, 2])
+        >>> new_x = x.scalar_mul(9)
+        >>> new_x.direction.tolist(), new_x.magnitude.tolist()
+        ([-1.0, 1.0], [36.0, 18.0])
+        >>> new_x = x.scalar_mul(numpy.array([0, -1]))
+        >>> new_x.direction.tolist(), new_x.magnitude.tolist()
+        ([0.0, -1.0], [0.0, 2.0])
+        """
+        return self._new(self.value * other)
+
+    def dot_product(self, other):
+        """This is the element wise scalar product of two Vectors
+
+        >>> x, y = VectorArray([-1, 1], [9, 2]), Vector(1, 4)
+        >>> x.dot_product(y).tolist()
+        [-36.0, 8.0]
+        """
+        return self.value * other.value
+
+    def __mul__(self, other):
+        """This is the left side default scalar multiplication or dot product
+
+        >>> x = VectorArray([-1], [4])
+        >>> (x * 9).value.tolist(), (x * x).tolist()
+        ([-36.0], [16.0])
+        """
+        if isinstance(other, (Vector, VectorArray)):
+            return self.dot_product(other)
+        return self.scalar_mul(other)
+
+    def __rmul__(self, other):
+        """This is the right side default scalar multiplication or dot product
+
+        >>> x = VectorArray([-1], [4])
+        >>> new_x = -8 * x
+        >>> new_x.direction.tolist(), new_x.magnitude.tolist()
+        ([1.0], [32.0])
+        >>> (Vector(-1, 9) * x).tolist()
+        [36.0]
+        """
+        return self * other
+
+    def __truediv__(self, other):
+        """This is left side default scalar division only
+
+        >>> x = VectorArray([-1], [6])
+        >>> (x/2).value.tolist()
+        [-3.0]
+        """
+        return self * (1/other)
+
+    def __pow__(self, power):
+        """This is dot product of itself
+
+        >>> x = VectorArray([-1], [6])
+        >>> (x ** 2).tolist(), (x ** 3).value.tolist()
+        ([36.0], [-216.0])
+        """
+        if power % 2 == 0:
+            return self.magnitude ** power
+        return self._new(self.direction * self.magnitude ** power)
+
+    def __abs__(self):
+        """This is the absolute value of every vector
+
+        >>> abs(VectorArray([-1], [6])).tolist()
+        [6.0]
+        """
+        return self.magnitude
+
+    def __lt__(self, other):
+        """This is the less than operator
+
+        >>> (VectorArray([-1, 1, 1], [10, 23, 24]) < Vector(1, 23)).tolist()
+        [True, False, False]
+        """
+        return self.value < other.value
+
+    def __le__(self, other):
+        """This is the less than or equal to operator
+
+        >>> (VectorArray([-1, 1, 1], [10, 23, 24]) <= Vector(1, 23)).tolist()
+        [True, True, False]
+        """
+        return self.value <= other.value
+
+    def __eq__(self, other):
+        """This is the equal to operator
+
+        >>> (VectorArray([-1, 1, 1], [10, 23, 24]) == Vector(1, 23)).tolist()
+        [False, True, False]
+        """
+        return self.value == other.value
+
+    def __ge__(self, other):
+        """This is the greater than or equal to operator
+
+        >>> (VectorArray([-1, 1, 1], [10, 23, 24]) >= Vector(1, 23)).tolist()
+        [False, True, True]
+        """
+        return self.value >= other.value
+
+    def __gt__(self, other):
+        """This is the greater than operator
+
+        >>> (VectorArray([-1, 1, 1], [10, 23, 24]) > Vector(1, 23)).tolist()
+        [False, False, True]
+        """
+        return self.value > other.value
+
+    __hash__ = None
+
+
+class PositionArray(VectorArray):
+    """Many single variable Position Vectors"""
+
+    __slots__ = ()
+    scalar_type = Position
+
+    def calc_velocity(self, time=1):
+        """This calculates the velocities given a certain time
+
+        >>> vel_x = PositionArray([1, -1], [10, 4]).calc_velocity(2)
+        >>> type(vel_x).__name__, vel_x.value.tolist()
+        ('VelocityArray', [5.0, -2.0])
+        """
+        return VelocityArray._from_value(self.value / time)
+
+
+class VelocityArray(VectorArray):
+    """Many single variable Velocity Vectors"""
+
+    __slots__ = ()
+    scalar_type = Velocity
+
+    def calc_position(self, time=1):
+        """This calculates the positions given a certain time
+
+        >>> pos_x = VelocityArray([1, -1], [10, 4]).calc_position(2)
+        >>> type(pos_x).__name__, pos_x.value.tolist()
+        ('PositionArray', [20.0, -8.0])
+        """
+        return PositionArray._from_value(self.value * time)
+
+    def calc_acceleration(self, time=1):
+        """This calculates the accelerations given a certain time
+
+        >>> accel_x = VelocityArray([1, -1], [10, 4]).calc_acceleration(2)
+        >>> type(accel_x).__name__, accel_x.value.tolist()
+        ('AccelerationArray', [5.0, -2.0])
+        """
+        return AccelerationArray._from_value(self.value / time)
+
+
+class AccelerationArray(VectorArray):
+    """Many single variable Acceleration Vectors"""
+
+    __slots__ = ()
+    scalar_type = Acceleration
+
+    def calc_velocity(self, time=1):
+        """This calculates the velocities given a certain time
+
+        >>> vel_x = AccelerationArray([1, -1], [10, 4]).calc_velocity(2)
+        >>> type(vel_x).__name__, vel_x.value.tolist()
+        ('VelocityArray', [20.0, -8.0])
+        """
+        return VelocityArray._from_value(self.value * time)
+
+
+class MomentumArray(VectorArray):
+    """Many single variable Momentum Vectors, descriptor of Velocity"""
+
+    __slots__ = ('mass', 'velocity')
+    scalar_type = Vector
+
+    def __init__(self, mass, velocity):
+        self.value = numpy.multiply(mass, velocity.value, dtype=float)
+        self.mass = mass
+        self.velocity = velocity
+
+    @staticmethod
+    def calc_total(mass, velocity):
+        """Calculates the total momentum along every axis of many objects, from an array of
+        masses and an array with the velocity of each object along every axis, without
+        building the momentum of each one
+
+        >>> MomentumArray.calc_total(numpy.array([5, 2]), numpy.array([[-10, 0], [3, 4]])).tolist()
+        [-44.0, 8.0]
+        """
+        return numpy.dot(mass, velocity).astype(float)
+
+    def calc_force(self, time=1):
+        """This calculates the forces given a certain time
+
+        >>> force_x = MomentumArray(numpy.array([5, 1]), VelocityArray([1, -1], [2, 4])).calc_force(2)
+        >>> type(force_x).__name__, force_x.value.tolist()
+        ('ForceArray', [5.0, -2.0])
+        """
+        return ForceArray(self.mass, self.velocity.calc_acceleration(time))
+
+
+class ForceArray(VectorArray):
+    """Many single variable Force Vectors, descriptor of Acceleration"""
+
+    __slots__ = ('mass', 'acceleration')
+    scalar_type = Vector
+
+    def __init__(self, mass, acceleration):
+        self.value = numpy.multiply(mass, acceleration.value, dtype=float)
+        self.mass = mass
+        self.acceleration = acceleration
+
+    def calc_momentum(self, time=1):
+        """This calculates the momenta given a certain time
+
+        >>> mom_x = ForceArray(numpy.array([5, 1]), AccelerationArray([1, -1], [2, 4])).calc_momentum(2)
+        >>> type(mom_x).__name__, mom_x.value.tolist()
+        ('MomentumArray', [20.0, -8.0])
+        """
+        return MomentumArray(self.mass, self.acceleration.calc_velocity(time))
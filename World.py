@@ -0,0 +1,317 @@
+#################
+### W O R L D ###
+#################
+
+
+# Contains the World store
+#
+# The World keeps the physical state of every Entity in contiguous arrays, one row per body.
+# Entities no longer own their Vectors; they hold bound Vectors that read and write their own
+# row, so the whole World can be moved in a single vectorized update.
+
+
+import numpy
+
+from Vector import *
+
+
+class World:
+    """Structure of arrays holding position, velocity, mass, dim and tensile strength
+
+    still counts the steps each body has gone without velocity, for putting bodies to sleep.
+
+    Sprite groups that belong to the World, such as its CollisionBoxes, are kept in groups.
+    """
+
+    columns = ('pos', 'previous', 'vel', 'dim', 'mass', 'tensile_strength', 'movable', 'still')
+
+    def __init__(self, capacity=16, axes=2):
+        """Creates an empty World with room for capacity bodies
+
+        >>> world = World()
+        >>> len(world), world.pos.shape
+        (0, (0, 2))
+        """
+        self.axes = axes
+        self.count = 0
+        self.entities = []
+        self.groups = {}
+        self._pos = numpy.zeros((capacity, axes))
+        self._previous = numpy.zeros((capacity, axes))
+        self._vel = numpy.zeros((capacity, axes))
+        self._dim = numpy.zeros((capacity, axes))
+        self._mass = numpy.zeros(capacity)
+        self._tensile_strength = numpy.zeros(capacity)
+        self._movable = numpy.zeros(capacity, dtype=bool)
+        self._still = numpy.zeros(capacity, dtype=int)
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def capacity(self):
+        return len(self._mass)
+
+    @property
+    def pos(self):
+        return self._pos[:self.count]
+
+    @property
+    def previous(self):
+        return self._previous[:self.count]
+
+    @property
+    def vel(self):
+        return self._vel[:self.count]
+
+    @property
+    def dim(self):
+        return self._dim[:self.count]
+
+    @property
+    def mass(self):
+        return self._mass[:self.count]
+
+    @property
+    def tensile_strength(self):
+        return self._tensile_strength[:self.count]
+
+    @property
+    def movable(self):
+        return self._movable[:self.count]
+
+    @property
+    def still(self):
+        return self._still[:self.count]
+
+    def reserve(self, capacity):
+        """Grows every column so that it can hold at least capacity bodies
+
+        >>> world = World(capacity=2)
+        >>> world.reserve(5)
+        >>> world.capacity
+        5
+        """
+        if capacity <= self.capacity:
+            return
+        for name in self.columns:
+            old = getattr(self, '_' + name)
+            new = numpy.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, '_' + name, new)
+
+    def add(self, entity, pos, dim, mass, tensile_strength, movable=False):
+        """Appends a body and returns the row it is stored in
+
+        >>> world = World(capacity=1)
+        >>> world.add(None, [1, 2], [3, 4], 5, 6), world.add(None, [7, 8], [9, 10], 11, 12)
+        (0, 1)
+        >>> world.pos.tolist(), world.mass.tolist()
+        ([[1.0, 2.0], [7.0, 8.0]], [5.0, 11.0])
+        """
+        if self.count == self.capacity:
+            self.reserve(2 * self.capacity or 1)
+        row = self.count
+        self._pos[row] = pos
+        self._previous[row] = pos
+        self._vel[row] = 0
+        self._dim[row] = dim
+        self._mass[row] = mass
+        self._tensile_strength[row] = tensile_strength
+        self._movable[row] = movable
+        self._still[row] = 0
+        self.entities.append(entity)
+        self.count += 1
+        return row
+
+    def extend(self, pos, dim, mass, tensile_strength, movable, vel=None):
+        """Appends many bodies at once, without entities, and returns the rows they are stored in
+
+        >>> world = World(capacity=1)
+        >>> world.extend([[0, 0], [5, 5]], [[1, 1], [1, 1]], [1, 2], [1, 1], [True, False])
+        range(0, 2)
+        >>> world.mass.tolist(), world.entities
+        ([1.0, 2.0], [None, None])
+        """
+        start = self.count
+        rows = slice(start, start + len(mass))
+        if rows.stop > self.capacity:
+            self.reserve(max(rows.stop, 2 * self.capacity))
+        self._pos[rows] = pos
+        self._previous[rows] = pos
+        self._vel[rows] = 0 if vel is None else vel
+        self._dim[rows] = dim
+        self._mass[rows] = mass
+        self._tensile_strength[rows] = tensile_strength
+        self._movable[rows] = movable
+        self._still[rows] = 0
+        self.entities.extend([None] * len(mass))
+        self.count = rows.stop
+        return range(start, rows.stop)
+
+    def _widths(self):
+        """Returns the name and number of values per body of every column"""
+        return [(name, int(numpy.prod(getattr(self, '_' + name).shape[1:]))) for name in self.columns]
+
+    def snapshot(self, out=None):
+        """Copies every column into one contiguous array with a row per body. The array can be
+        given as out, such as one from an earlier snapshot, to reuse it
+
+        >>> world = World()
+        >>> world.add(None, [1, 2], [3, 4], 5, 6, movable=True)
+        0
+        >>> snapshot = world.snapshot()
+        >>> snapshot.shape, snapshot[0].tolist()
+        ((1, 12), [1.0, 2.0, 1.0, 2.0, 0.0, 0.0, 3.0, 4.0, 5.0, 6.0, 1.0, 0.0])
+        """
+        widths = self._widths()
+        width = sum(width for _, width in widths)
+        if out is None or out.shape != (self.count, width):
+            out = numpy.empty((self.count, width))
+        start = 0
+        for name, width in widths:
+            out[:, start:start + width] = getattr(self, name).reshape(self.count, width)
+            start += width
+        return out
+
+    def restore(self, snapshot):
+        """Puts every column back as it was when the snapshot was taken
+
+        >>> world = World()
+        >>> world.add(None, [0, 0], [1, 1], 1, 1, movable=True)
+        0
+        >>> world.vel[0] = 2, 0
+        >>> snapshot = world.snapshot()
+        >>> world.move()
+        >>> world.restore(snapshot)
+        >>> world.pos.tolist()
+        [[0.0, 0.0]]
+        """
+        if len(snapshot) != self.count:
+            raise ValueError('the snapshot has %d bodies but the World has %d' % (len(snapshot), self.count))
+        start = 0
+        for name, width in self._widths():
+            column = getattr(self, name)
+            column[...] = snapshot[:, start:start + width].reshape(column.shape)
+            start += width
+
+    def move(self, time=1):
+        """Advances every movable body by its velocity over the given time
+
+        >>> world = World()
+        >>> world.add(None, [0, 0], [1, 1], 1, 1, movable=True)
+        0
+        >>> world.add(None, [5, 5], [1, 1], 1, 1)
+        1
+        >>> world.vel[:] = [[2, -1], [3, 3]]
+        >>> world.move(2)
+        >>> world.pos.tolist()
+        [[4.0, -2.0], [5.0, 5.0]]
+        """
+        numpy.add(self.pos, self.vel * time, out=self.pos, where=self.movable[:, None])
+
+    def move_row(self, row, time=1):
+        """Advances a single body by its velocity over the given time"""
+        self._pos[row] += self._vel[row] * time
+
+    def settle(self, steps):
+        """Counts one more step for every body without velocity, starts the count again for
+        every body with velocity, and returns which bodies have been still for at least the
+        given steps
+
+        >>> world = World()
+        >>> world.extend([[0, 0], [5, 5]], [[1, 1], [1, 1]], [1, 1], [1, 1], [True, True], vel=[[0, 0], [1, 0]])
+        range(0, 2)
+        >>> world.settle(2).tolist(), world.settle(2).tolist()
+        ([False, False], [True, False])
+        >>> world.vel[0] = 0, -1
+        >>> world.settle(2).tolist(), world.still.tolist()
+        ([False, False], [0, 0])
+        """
+        still = self.still
+        still += 1
+        still[self.vel.any(axis=1)] = 0
+        return still >= steps
+
+    def along_x(self, rows=slice(None)):
+        """Returns whether the bodies in rows have their centres on one line along x and no
+        velocity across it, so that they can only ever meet along x
+
+        >>> world = World()
+        >>> world.extend([[0, 0], [20, 5]], [[10, 10], [10, 10]], [1, 1], [1, 1], [True, True], vel=[[1, 0], [-1, 0]])
+        range(0, 2)
+        >>> world.along_x(), world.along_x([0])
+        (False, True)
+        """
+        centre = self.pos[rows, 1:] + self.dim[rows, 1:] / 2
+        return bool(not self.vel[rows, 1:].any() and (centre == centre[:1]).all())
+
+    def save_previous(self):
+        """Remembers the positions at the start of a physics step for interpolation"""
+        self.previous[:] = self.pos
+
+    def interpolate(self, alpha=1, row=slice(None)):
+        """Returns the positions part way, by alpha, from the previous physics step to the current
+
+        >>> world = World()
+        >>> world.add(None, [0, 0], [1, 1], 1, 1, movable=True)
+        0
+        >>> world.vel[0] = 10, 0
+        >>> world.save_previous()
+        >>> world.move()
+        >>> world.interpolate(0.25).tolist(), world.interpolate(1, 0).tolist()
+        ([[2.5, 0.0]], [10.0, 0.0])
+        """
+        previous = self.previous[row]
+        return previous + (self.pos[row] - previous) * alpha
+
+
+class Bound(Vector):
+    """Vector whose signed value lives in one cell of a World column
+
+    >>> world = World()
+    >>> world.add(None, [0, 0], [1, 1], 1, 1)
+    0
+    >>> vel = BoundVelocity(world, '_vel', 0, 0)
+    >>> vel.direction, vel.magnitude = -1, 10
+    >>> world.vel[0, 0], vel.direction
+    (np.float64(-10.0), -1.0)
+    >>> new_pos = vel.calc_position(2)
+    >>> type(new_pos).__name__, new_pos.direction, new_pos.magnitude
+    ('Position', -1.0, 20.0)
+    """
+
+    __slots__ = ('world', 'column', 'row', 'axis')
+    kind = Vector
+
+    def __init__(self, world, column, row, axis):
+        self.world = world
+        self.column = column
+        self.row = row
+        self.axis = axis
+        self._direction = 0
+
+    @property
+    def value(self):
+        return float(getattr(self.world, self.column)[self.row, self.axis])
+
+    @value.setter
+    def value(self, value):
+        getattr(self.world, self.column)[self.row, self.axis] = value
+
+    def _new(self, value):
+        return Vector.create_vector(self.kind, value)
+
+
+class BoundPosition(Bound, Position):
+    """Position Vector stored in a World row"""
+
+    __slots__ = ()
+    kind = Position
+
+
+class BoundVelocity(Bound, Velocity):
+    """Velocity Vector stored in a World row"""
+
+    __slots__ = ()
+    kind = Velocity